@@ -10,6 +10,8 @@
     Main entry point for the application
 """
 
+import asyncio
+
 from src.supervisor.job_supervisor import JobSupervisor
 
 # create the supervisor
@@ -17,11 +19,10 @@ supervisor = JobSupervisor()
 
 try:
     # initiate the polling for work
-    supervisor.run()
+    asyncio.run(supervisor.run())
 except Exception:
     # log the reason for the shutdown
     supervisor.logger.exception('The Job Supervisor (%s) is shutting down...', supervisor.system)
 
 # let everyone know the application is shutting down
-supervisor.util_objs['utils'].send_slack_msg(None, f'The Job Supervisor ({supervisor.system}) application is shutting down.',
-                                             'slack_status_channel')
+supervisor.utils.send_slack_msg(None, f'The Job Supervisor ({supervisor.system}) application is shutting down.', 'slack_status_channel')
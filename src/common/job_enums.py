@@ -55,3 +55,7 @@ class JobType(str, Enum):
     ERROR = 'error'
     OTHER_1 = 'TBD'
     COMPLETE = 'complete'
+
+
+# lookup of the job types by their value. this is a plain dict lookup, without the overhead of calling JobType(value)
+JOB_TYPE_VALUES: dict = {job_type.value: job_type for job_type in JobType}
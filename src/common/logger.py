@@ -86,8 +86,7 @@ class LoggingUtil:
         log_path: str = os.getenv('LOG_PATH', os.path.dirname(__file__))
 
         # create the dir if it does not exist
-        if not os.path.exists(log_path):
-            os.mkdir(log_path)
+        os.makedirs(log_path, exist_ok=True)
 
         # return to the caller
         return log_level, log_path
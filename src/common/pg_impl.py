@@ -39,6 +39,9 @@ class PGImplementation(PGUtilsMultiConnect):
         # init the base class
         PGUtilsMultiConnect.__init__(self, 'APSViz.Supervisor.Jobs.PGImplementation', db_names, _logger=self.logger, _auto_commit=_auto_commit)
 
+        # init the cache of the first job in each workflow type. cleared when the workflow definitions are reloaded
+        self.first_job_cache: dict = {}
+
     def __del__(self):
         """
         Calls super base class to clean up DB connections and cursors.
@@ -84,48 +87,69 @@ class PGImplementation(PGUtilsMultiConnect):
         # return to the caller
         return ret_val
 
-    def update_job_status(self, run_id, value):
+    def update_job_status_bulk(self, status_updates: dict):
         """
-        updates the job status
+        updates the job status of a number of runs in one DB round-trip
 
-        :param run_id:
-        :param value:
+        :param status_updates: dict of run id to status value
         :return: nothing
         """
+        # init the rows of values
+        rows: list = []
 
-        # split the run id. run id is in the form <instance id>_<uid><_HECRAS>
-        run = run_id.split('-')
+        # for each run id and status
+        for run_id, value in status_updates.items():
+            # split the run id. run id is in the form <instance id>_<uid><_HECRAS>
+            run = str(run_id).split('-')
 
-        # build the uid
-        uid = '-'.join(run[1:])
+            # the instance id must be a number and there must be a uid. skip this run if not so the rest still get written
+            if not run[0].isdigit() or len(run) < 2:
+                self.logger.error('Invalid run id %s, status not updated: %s', run_id, value)
+                continue
 
-        # create the sql. ensure the value does not exceed the column size (1024)
-        sql = f"SELECT public.set_config_item({int(run[0])}, '{uid}', 'supervisor_job_status', '{value[:1024]}')"
+            # add the instance id, uid and status. ensure the value does not exceed the column size (1024)
+            rows.append((int(run[0]), '-'.join(run[1:]), value[:1024]))
 
-        # run the SQL
-        ret_val = self.exec_sql('apsviz', sql)
+        # if there is anything to write
+        if rows:
+            # create the sql
+            sql = ("SELECT public.set_config_item(v.instance_id, v.uid, 'supervisor_job_status', v.value) "
+                   "FROM (VALUES %s) AS v(instance_id, uid, value)")
 
-        # if there were no errors, commit the updates
-        if ret_val > -1:
-            self.commit('apsviz')
+            # run the SQL. the updates are committed when the statement runs
+            self.exec_sql_values('apsviz', sql, rows)
 
-    def get_first_job(self, workflow_type: str):
+    def clear_first_job_cache(self):
         """
-        gets the supervisor job order
+        clears the cached first jobs so they are looked up again
 
-        :return:
+        :return: nothing
         """
-        # create the sql
-        sql: str = f"SELECT public.get_supervisor_job_order('{workflow_type}')"
+        # remove all the cached workflow types
+        self.first_job_cache.clear()
 
-        # get the order of jobs for this workflow type
-        jobs_in_order = self.exec_sql('apsviz', sql)
+    def get_first_job(self, workflow_type: str):
+        """
+        gets the supervisor job order. the result is cached per workflow type
 
-        # if we got a list get the first one
-        if isinstance(jobs_in_order, list):
-            ret_val = jobs_in_order[0]['job_name']
+        :return:
+        """
+        # use the cached first job if this workflow type has already been looked up
+        if workflow_type in self.first_job_cache:
+            ret_val = self.first_job_cache[workflow_type]
         else:
-            ret_val = None
+            # create the sql
+            sql: str = f"SELECT public.get_supervisor_job_order('{workflow_type}')"
+
+            # get the order of jobs for this workflow type
+            jobs_in_order = self.exec_sql('apsviz', sql)
+
+            # if we got a list get the first one and cache it
+            if isinstance(jobs_in_order, list):
+                ret_val = jobs_in_order[0]['job_name']
+                self.first_job_cache[workflow_type] = ret_val
+            else:
+                ret_val = None
 
         # return the first item in the ordered list
         return ret_val
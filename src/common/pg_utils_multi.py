@@ -14,9 +14,14 @@
 
 import os
 import time
+import select
+import threading
 from collections import namedtuple
 
 import psycopg2
+from psycopg2 import sql
+from psycopg2.pool import ThreadedConnectionPool
+from psycopg2.extras import execute_values
 
 from src.common.logger import LoggingUtil
 
@@ -25,12 +30,12 @@ class PGUtilsMultiConnect:
     """
         Base class for database functionalities.
 
-        This class supports setting up connections to multiple databases. To do that
+        This class supports setting up connection pools to multiple databases. To do that
         the class relies on environment parameter names that adhere to a specific
         naming convention. e.g. <DB name>_DB_<parameter name>. Note that the
         final environment parameter should be all uppercase.
 
-        Please see the get_conn_config() method below for more details.
+        Please see the get_conn_config() and get_db_pool() methods below for more details.
     """
 
     def __init__(self, app_name, db_names: tuple, _logger=None, _auto_commit=True):
@@ -56,22 +61,24 @@ class PGUtilsMultiConnect:
         # set the autocommit
         self.auto_commit = _auto_commit
 
-        # create the named tuple definition for DB info
-        self.db_info_tpl: namedtuple = namedtuple('DB_Info', ['name', 'conn_str', 'conn'])
+        # create the named tuple definition for DB info. slots limits the number of
+        # connections handed out so that callers wait rather than exhaust the pool
+        self.db_info_tpl: namedtuple = namedtuple('DB_Info', ['name', 'conn_str', 'pool', 'slots'])
 
         # save the DB names for connection/cursor closing on class tear-down
         self.db_names: tuple = db_names
 
+        # init the dedicated connection used to LISTEN for DB notifications
+        self.listen_conn = None
+        self.listen_params: tuple = ()
+
         # get the details loaded into a tuple for all the DBs
         for db_name in self.db_names:
             # get the connection string
             conn_config = self.get_conn_config(db_name)
 
-            # create a temporary tuple to get the discovery process started
-            temp_tuple: namedtuple = self.db_info_tpl(db_name, conn_config, None)
-
-            # get the connection
-            self.get_db_connection(temp_tuple)
+            # get the connection pool
+            self.get_db_pool(db_name, conn_config)
 
     def __del__(self):
         """
@@ -84,21 +91,22 @@ class PGUtilsMultiConnect:
             # close the connection
             self.close_conn(db_name)
 
+        # close the notification connection if there is one
+        if self.listen_conn is not None:
+            self.listen_conn.close()
+
     def close_conn(self, db_name: str):
         """
-        Closes a DB connection
+        Closes all the connections in a DB connection pool
 
         :param db_name:
         :return:
         """
         try:
-            # if there is a connection, close it
-            if self.dbs[db_name].conn is not None:
-                # get the item out of the tuple
-                conn = self.dbs[db_name].conn
-
-                # close it
-                conn.close()
+            # if there is a connection pool, close it
+            if self.dbs[db_name].pool is not None:
+                # close all the connections
+                self.dbs[db_name].pool.closeall()
         except Exception:
             self.logger.warning('Error detected closing the %s DB connection.', db_name)
 
@@ -126,65 +134,128 @@ class PGUtilsMultiConnect:
         # return to the caller
         return connection_str
 
-    def get_db_connection(self, db_info: namedtuple) -> bool:
+    def get_db_pool(self, db_name: str, conn_str: str):
         """
-        Gets a connection to the DB. performs a check to continue trying until
-        a connection is made.
+        Creates the connection pool for a DB. performs a check to continue trying until
+        the pool is created.
+
+        The pool size comes from the <DB name>_DB_POOL_MIN (default 2) and <DB name>_DB_POOL_MAX
+        (default 10) environment parameters. Keep the max below the Postgres max_connections
+        divided by the number of clients.
 
+        :param db_name:
+        :param conn_str:
         :return:
         """
-        # init the connection status indicator
-        good_conn: bool = False
+        # insure the env parameter prefix is uppercase
+        env_name: str = db_name.upper().replace('-', '_')
+
+        # get the pool size
+        min_conn: int = int(os.environ.get(f'{env_name}_DB_POOL_MIN', '2'))
+        max_conn: int = int(os.environ.get(f'{env_name}_DB_POOL_MAX', '10'))
 
         # until forever
-        while not good_conn:
+        while True:
             try:
-                # check the DB connection
-                good_conn = self.check_db_connection(db_info)
+                # create the pool. this opens the minimum number of connections
+                pool = ThreadedConnectionPool(min_conn, max_conn, conn_str)
 
-                # try to get a connection if the check failed
-                if not good_conn:
-                    # try to connect to the DB
-                    conn = psycopg2.connect(db_info.conn_str)
+                # add the pool to the dict
+                self.dbs.update({db_name: self.db_info_tpl(db_name, conn_str, pool, threading.BoundedSemaphore(max_conn))})
 
-                    # set the autocommit on the connection
-                    conn.autocommit = self.auto_commit
+                self.logger.debug('DB Connection pool established (auto commit %s, max connections %s) to %s.', self.auto_commit, max_conn, db_name)
 
-                    # create a new db info tuple
-                    verified_tuple: namedtuple = self.db_info_tpl(db_info.name, db_info.conn_str, conn)
+                # no need to continue
+                break
+            except psycopg2.OperationalError:
+                # the DB could not be reached, keep trying
+                self.logger.exception('Error getting connection pool %s.', db_name)
 
-                    # check the new DB connection
-                    good_conn = self.check_db_connection(verified_tuple)
+            self.logger.error('DB Connection pool failed to %s. Retrying...', db_name)
+            time.sleep(5)
 
-                    # is the connection ok now?
-                    if not good_conn:
-                        self.logger.warning('DB Connection not established (auto commit %s) to %s.', self.auto_commit, db_info.name)
-                    else:
-                        self.logger.debug('DB Connection established (auto commit %s) to %s.', self.auto_commit, db_info.name)
+    def get_db_connection(self, db_name: str):
+        """
+        Gets a connection to the DB from the pool. performs a check to continue trying until
+        a good connection is made. The connection must be returned with release_db_connection().
 
-                        # add the verified connection to the dict
-                        self.dbs.update({db_info.name: verified_tuple})
+        :param db_name:
+        :return: the connection
+        """
+        # get the appropriate db info object
+        db_info = self.dbs[db_name]
+
+        # wait for a free connection slot
+        db_info.slots.acquire()
+
+        # until a good connection is made
+        while True:
+            # init the connection
+            conn = None
 
-                        # no need to continue
-                        break
+            try:
+                # get a connection from the pool
+                conn = db_info.pool.getconn()
+
+                # set the autocommit on the connection. this must be done before the check runs a statement as
+                # psycopg2 will not change it once a transaction has been started
+                if conn.autocommit != self.auto_commit:
+                    conn.autocommit = self.auto_commit
 
+                # check the DB connection
+                if self.check_db_connection(db_name, conn):
+                    # end the transaction the check started if the connection does not auto commit
+                    if not conn.autocommit:
+                        conn.rollback()
+
+                    # no need to continue
+                    break
+
+                self.logger.warning('DB Connection not established (auto commit %s) to %s.', self.auto_commit, db_name)
+            except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                self.logger.exception('Error getting connection %s.', db_name)
             except Exception:
-                self.logger.exception('Error getting connection %s.', db_info.name)
-                good_conn = False
+                # this is not a connection failure so retrying will not help. give back the connection and the slot
+                if conn is not None:
+                    db_info.pool.putconn(conn, close=True)
 
-            # are we still looking for a connection
-            if good_conn is False:
-                self.logger.error('DB Connection failed to %s. Retrying...', db_info.name)
-                time.sleep(5)
+                db_info.slots.release()
 
-        # return pass/fail flag
-        return good_conn
+                raise
+
+            # discard the bad connection so the pool opens a new one
+            if conn is not None:
+                db_info.pool.putconn(conn, close=True)
+
+            self.logger.error('DB Connection failed to %s. Retrying...', db_name)
+            time.sleep(5)
 
-    def check_db_connection(self, db_info: namedtuple) -> bool:
+        # return the good connection
+        return conn
+
+    def release_db_connection(self, db_name: str, conn):
+        """
+        Returns a connection to the DB pool
+
+        :param db_name:
+        :param conn:
+        :return:
+        """
+        # get the appropriate db info object
+        db_info = self.dbs[db_name]
+
+        # return the connection
+        db_info.pool.putconn(conn)
+
+        # free up the connection slot
+        db_info.slots.release()
+
+    def check_db_connection(self, db_name: str, conn) -> bool:
         """
         Checks to see if there is a good connection to the DB.
 
-        :param db_info:
+        :param db_name:
+        :param conn:
         :return: boolean
         """
         # init the return value
@@ -195,14 +266,14 @@ class PGUtilsMultiConnect:
 
         try:
             # is there an existing connection
-            if not db_info.conn:
-                self.logger.debug('Existing DB connection not found for %s', db_info.name)
+            if not conn or conn.closed:
+                self.logger.debug('Existing DB connection not found for %s', db_name)
 
                 # force getting a new connection
                 ret_val = False
             else:
                 # get the cursor
-                cursor = db_info.conn.cursor()
+                cursor = conn.cursor()
 
                 # get the DB version
                 cursor.execute("SELECT version()")
@@ -231,6 +302,12 @@ class PGUtilsMultiConnect:
             # connection failed
             ret_val = False
 
+        finally:
+            # in there is a cursor, close it
+            if cursor is not None:
+                # close it
+                cursor.close()
+
         # return to the caller
         return ret_val
 
@@ -245,64 +322,177 @@ class PGUtilsMultiConnect:
         # init the return
         ret_val = None
 
-        # get the appropriate db info object
-        db_info = self.dbs[db_name]
+        # get a connection from the pool
+        conn = self.get_db_connection(db_name)
 
-        # insure we have a valid DB connection
-        success = self.get_db_connection(db_info)
+        # init the cursor
+        cursor = None
 
-        # did we get a connection
-        if success:
-            # init the cursor
-            cursor = None
+        try:
+            # get a cursor
+            cursor = conn.cursor()
 
-            try:
-                # make sure the latest db_info is used
-                db_info = self.dbs[db_name]
+            # execute the sql
+            cursor.execute(sql_stmt)
 
-                # get a cursor
-                cursor = db_info.conn.cursor()
+            # get the returned value
+            ret_val = cursor.fetchone()
 
-                # execute the sql
-                cursor.execute(sql_stmt)
+            # if this connection is set to not auto commit, commit the work
+            if not conn.autocommit:
+                conn.commit()
 
-                # get the returned value
-                ret_val = cursor.fetchone()
+            # trap the return
+            if ret_val is None or ret_val[0] is None:
+                # specify a return code on an empty result
+                ret_val = -1
+            else:
+                # get the one and only record of json
+                ret_val = ret_val[0]
 
-                # trap the return
-                if ret_val is None or ret_val[0] is None:
-                    # specify a return code on an empty result
-                    ret_val = -1
-                else:
-                    # get the one and only record of json
-                    ret_val = ret_val[0]
+        except Exception:
+            self.logger.exception("Error detected executing SQL: %s.", sql_stmt)
 
-            except Exception:
-                self.logger.exception("Error detected executing SQL: %s.", sql_stmt)
+            # undo any partial work
+            if not conn.autocommit:
+                conn.rollback()
 
-                # set the error code
-                ret_val = -1
-            finally:
-                # in there is a cursor, close it
-                if cursor is not None:
-                    # close it
-                    cursor.close()
+            # set the error code
+            ret_val = -1
+        finally:
+            # in there is a cursor, close it
+            if cursor is not None:
+                # close it
+                cursor.close()
+
+            # return the connection to the pool
+            self.release_db_connection(db_name, conn)
+
+        # return to the caller
+        return ret_val
+
+    def exec_sql_values(self, db_name: str, sql_stmt: str, values: list) -> int:
+        """
+        Executes a sql statement for a list of value tuples in a single round-trip.
+
+        The statement must contain a single %s placeholder that is expanded to a VALUES list.
+
+        :param db_name:
+        :param sql_stmt:
+        :param values:
+        :return: the number of rows affected or -1 on error
+        """
+        # init the return
+        ret_val: int = -1
+
+        # get a connection from the pool
+        conn = self.get_db_connection(db_name)
+
+        # init the cursor
+        cursor = None
+
+        try:
+            # get a cursor
+            cursor = conn.cursor()
+
+            # execute the sql for all the values
+            execute_values(cursor, sql_stmt, values)
+
+            # get the number of rows affected
+            ret_val = cursor.rowcount
+
+            # if this connection is set to not auto commit, commit the work
+            if not conn.autocommit:
+                conn.commit()
+
+        except Exception:
+            self.logger.exception("Error detected executing SQL: %s.", sql_stmt)
+
+            # undo any partial work
+            if not conn.autocommit:
+                conn.rollback()
 
-        else:
             # set the error code
             ret_val = -1
+        finally:
+            # in there is a cursor, close it
+            if cursor is not None:
+                # close it
+                cursor.close()
+
+            # return the connection to the pool
+            self.release_db_connection(db_name, conn)
 
         # return to the caller
         return ret_val
 
-    def commit(self, db_name: str):
+    def listen(self, db_name: str, channel: str) -> bool:
         """
-        issues a transaction commit
+        Opens a dedicated, auto-committed connection that listens for notifications on a channel.
 
         :param db_name:
-        :return:
+        :param channel:
+        :return: boolean success flag
+        """
+        # save the params so the connection can be re-established later
+        self.listen_params = (db_name, channel)
+
+        try:
+            # get a connection that is not shared with the query traffic
+            self.listen_conn = psycopg2.connect(self.dbs[db_name].conn_str)
+
+            # notifications are only delivered outside a transaction
+            self.listen_conn.autocommit = True
+
+            # start listening on the channel. the channel name is quoted as an identifier since it comes from the config
+            with self.listen_conn.cursor() as cursor:
+                cursor.execute(sql.SQL('LISTEN {}').format(sql.Identifier(channel)))
+
+            self.logger.debug('Listening for notifications on the %s channel of %s.', channel, db_name)
+        except Exception:
+            self.logger.exception('Error listening for notifications on the %s channel of %s.', channel, db_name)
+
+            # clear the connection so the next wait tries again
+            self.listen_conn = None
+
+        # return pass/fail flag
+        return self.listen_conn is not None
+
+    def wait_for_notify(self, timeout: float) -> bool:
+        """
+        Waits up to timeout seconds for a notification on the channel passed to listen().
+
+        If the listening connection is unusable this just sleeps for the timeout and reports a
+        notification so that callers fall back to polling.
+
+        :param timeout:
+        :return: True if a notification arrived (or the state is unknown)
         """
-        # if this connection is set to not auto commit
-        if not self.dbs[db_name].conn.autocommit:
-            # issue the commit
-            self.dbs[db_name].conn.commit()
+        # init the return value
+        ret_val: bool = True
+
+        # make sure there is a listening connection
+        if self.listen_conn is None and (not self.listen_params or not self.listen(*self.listen_params)):
+            # fall back to a simple wait
+            time.sleep(timeout)
+        else:
+            try:
+                # wait in the kernel for something to show up on the connection
+                if select.select([self.listen_conn], [], [], timeout) != ([], [], []):
+                    # read what arrived
+                    self.listen_conn.poll()
+
+                # were there any notifications
+                ret_val = bool(self.listen_conn.notifies)
+
+                # clear them for the next wait
+                self.listen_conn.notifies.clear()
+            except Exception:
+                self.logger.exception('Error waiting for notifications on %s.', self.listen_params)
+
+                # drop the connection so the next wait re-establishes it
+                self.listen_conn.close()
+                self.listen_conn = None
+
+        # return to the caller
+        return ret_val
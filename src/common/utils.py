@@ -13,6 +13,8 @@
 """
 
 import os
+import time
+import asyncio
 import datetime as dt
 from json import load
 from slack_sdk import WebClient
@@ -24,6 +26,9 @@ class Utils:
     Methods that are common to components in the project
     """
 
+    # the parsed baseline run configuration, shared by all the components that load it. keyed by file path, holds the file modification time and data
+    base_config_cache: dict = {}
+
     def __init__(self, logger, system, app_version):
         """
         Initialization of this class
@@ -42,38 +47,60 @@ class Utils:
         self.slack_channels: dict = {'slack_status_channel': os.getenv('SLACK_STATUS_CHANNEL'),
                                      'slack_issues_channel': os.getenv('SLACK_ISSUES_CHANNEL')}
 
+        # create the Slack clients once so their connections are reused for every message
+        self.slack_clients: dict = {'slack_status_channel': WebClient(token=os.getenv('SLACK_STATUS_TOKEN')),
+                                    'slack_issues_channel': WebClient(token=os.getenv('SLACK_ISSUES_TOKEN'))}
+
+        # init the queue of Slack messages waiting to be sent and the task that sends them. these are created on first use
+        # inside the event loop
+        self.slack_queue = None
+        self.slack_worker = None
+
         # get the config data
         self.k8s_config: dict = Utils.get_base_config()
 
     @staticmethod
     def get_base_config() -> dict:
         """
-        gets the baseline run configuration
+        gets the baseline run configuration. the file is only parsed again if it has changed since it was last loaded.
+
+        note: the returned dict is shared by all callers, so it must not be changed. callers that modify it must make a copy.
 
         :return: Dict, baseline run params
         """
         # get the config file path/name
         config_name = os.path.join(os.path.dirname(__file__), 'base_config.json')
 
-        # open the config file
-        with open(config_name, 'r', encoding='utf-8') as json_file:
-            # load the config items into a dict
-            data: dict = load(json_file)
+        # get the time the file was last modified
+        modified: int = os.stat(config_name).st_mtime_ns
+
+        # get the cached config for this file
+        cached: tuple = Utils.base_config_cache.get(config_name)
+
+        # if the file was already loaded and has not changed since, use the cached data
+        if cached is not None and cached[0] == modified:
+            data: dict = cached[1]
+        else:
+            # open the config file
+            with open(config_name, 'r', encoding='utf-8') as json_file:
+                # load the config items into a dict
+                data: dict = load(json_file)
+
+            # save the config for the next caller
+            Utils.base_config_cache[config_name] = (modified, data)
 
         # return the config data
         return data
 
-    def send_slack_msg(self, run_id: str, msg: str, channel: str, debug_mode: bool = False, instance_name: str = None, emoticon: str = None):
+    def format_slack_msg(self, run_id: str, msg: str, instance_name: str = None, emoticon: str = None) -> str:
         """
-        sends a msg to the Slack channel
+        builds the full text of a Slack msg
 
         :param run_id: the ID of the supervisor run
         :param msg: the msg to be sent
-        :param channel: the Slack channel to post the message to
-        :param debug_mode: mode to indicate that this is a no-op
         :param instance_name: the name of the APSVIZ instance
         :param emoticon: an emoticon if set
-        :return: nothing
+        :return: the msg text
         """
         # init the final msg
         final_msg: str = f"APSViz Job Supervisor:{self.app_version} ({self.system}) - "
@@ -84,23 +111,170 @@ class Utils:
         # add the run id and msg
         final_msg += msg if run_id is None else f'Run ID: {run_id} - {"" if emoticon is None else emoticon} {msg}'
 
+        # return the msg to the caller
+        return final_msg
+
+    def can_post_slack_msg(self, debug_mode: bool) -> bool:
+        """
+        checks to see if a msg should go to Slack. msgs are only posted when not in debug mode and not running locally
+
+        :param debug_mode: mode to indicate that this is a no-op
+        :return: True if the msg should be posted
+        """
+        return not debug_mode and self.system in ['Dev', 'Prod', 'AWS/EKS']
+
+    def post_slack_msg(self, channel: str, text: str):
+        """
+        posts the text to the Slack channel
+
+        :param channel: the Slack channel to post the message to
+        :param text: the text to post
+        :return: nothing
+        """
+        # determine the client based on the channel
+        client = self.slack_clients.get(channel, self.slack_clients['slack_issues_channel'])
+
+        try:
+            # send the message
+            client.chat_postMessage(channel=self.slack_channels[channel], text=text)
+        except SlackApiError:
+            # log the error
+            self.logger.exception('Slack %s messaging failed. msg: %s', self.slack_channels[channel], text)
+
+    def send_slack_msg(self, run_id: str, msg: str, channel: str, debug_mode: bool = False, instance_name: str = None, emoticon: str = None):
+        """
+        sends a msg to the Slack channel
+
+        :param run_id: the ID of the supervisor run
+        :param msg: the msg to be sent
+        :param channel: the Slack channel to post the message to
+        :param debug_mode: mode to indicate that this is a no-op
+        :param instance_name: the name of the APSVIZ instance
+        :param emoticon: an emoticon if set
+        :return: nothing
+        """
+        # build the final msg
+        final_msg: str = self.format_slack_msg(run_id, msg, instance_name, emoticon)
+
         # log the message
         self.logger.info(final_msg)
 
         # send the message to Slack if not in debug mode and not running locally
-        if not debug_mode and self.system in ['Dev', 'Prod', 'AWS/EKS']:
-            # determine the client based on the channel
-            if channel == 'slack_status_channel':
-                client = WebClient(token=os.getenv('SLACK_STATUS_TOKEN'))
-            else:
-                client = WebClient(token=os.getenv('SLACK_ISSUES_TOKEN'))
+        if self.can_post_slack_msg(debug_mode):
+            self.post_slack_msg(channel, final_msg)
+
+    def queue_slack_msg(self, run_id: str, msg: str, channel: str, *, debug_mode: bool = False, instance_name: str = None, emoticon: str = None):
+        """
+        queues a msg to be sent to the Slack channel without waiting for it to be delivered.
+        the msg is sent immediately if there is no running event loop.
+
+        :param run_id: the ID of the supervisor run
+        :param msg: the msg to be sent
+        :param channel: the Slack channel to post the message to
+        :param debug_mode: mode to indicate that this is a no-op
+        :param instance_name: the name of the APSVIZ instance
+        :param emoticon: an emoticon if set
+        :return: nothing
+        """
+        try:
+            # get the running event loop
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # no event loop, so just send the message now
+            self.send_slack_msg(run_id, msg, channel, debug_mode, instance_name, emoticon)
+        else:
+            # create the queue and the task that drains it on first use
+            if self.slack_worker is None:
+                self.slack_queue = asyncio.Queue()
+                self.slack_worker = asyncio.create_task(self.send_queued_slack_msgs())
+
+            # build and log the final msg now so the log order matches the order of events
+            final_msg: str = self.format_slack_msg(run_id, msg, instance_name, emoticon)
+            self.logger.info(final_msg)
+
+            # add the message to the queue if it is to be posted
+            if self.can_post_slack_msg(debug_mode):
+                self.slack_queue.put_nowait((channel, final_msg))
+
+    async def send_queued_slack_msgs(self):
+        """
+        sends the queued Slack messages in order. messages that queued up together are posted as
+        one message per channel. the Slack client is blocking, so each post is done in a worker thread.
+
+        :return: nothing
+        """
+        # until the event loop goes away
+        while True:
+            # wait for the next message
+            batch: list = [await self.slack_queue.get()]
+
+            # pick up anything else that is already waiting, up to the batch limit
+            while not self.slack_queue.empty() and len(batch) < self.k8s_config.get('SLACK_BATCH_MAX', 20):
+                batch.append(self.slack_queue.get_nowait())
 
             try:
-                # send the message
-                client.chat_postMessage(channel=self.slack_channels[channel], text=final_msg)
-            except SlackApiError:
-                # log the error
-                self.logger.exception('Slack %s messaging failed. msg: %s', self.slack_channels[channel], final_msg)
+                # post the messages
+                await asyncio.to_thread(self.post_slack_batch, batch)
+            except Exception:
+                # log the error and keep going
+                self.logger.exception('Error sending queued Slack messages.')
+            finally:
+                # mark the messages as handled
+                for _ in batch:
+                    self.slack_queue.task_done()
+
+    def post_slack_batch(self, batch: list):
+        """
+        posts a batch of queued Slack messages as one message per channel
+
+        :param batch: list of channel and msg text tuples
+        :return: nothing
+        """
+        # group the message text by channel, keeping the order they were queued in
+        channel_msgs: dict = {}
+
+        for channel, final_msg in batch:
+            channel_msgs.setdefault(channel, []).append(final_msg)
+
+        # post each channel's messages
+        for channel, msgs in channel_msgs.items():
+            self.post_slack_msg(channel, '\n'.join(msgs))
+
+    async def flush_slack_msgs(self, timeout: float = 30.0):
+        """
+        waits for the queued Slack messages to be sent. this is called when the supervisor shuts down,
+        even on an error, so that the messages queued last are not lost. anything the worker task
+        did not get to is sent directly.
+
+        :param timeout: the most seconds to wait for the messages to be sent
+        :return: nothing
+        """
+        # if messages have been queued
+        if self.slack_worker is not None:
+            # if the task sending the messages is still running let it finish what is queued
+            if not self.slack_worker.done():
+                try:
+                    # wait for the queue to empty
+                    await asyncio.wait_for(self.slack_queue.join(), timeout)
+                except asyncio.TimeoutError:
+                    self.logger.error('Timed out sending %s queued Slack messages.', self.slack_queue.qsize())
+
+                # the task is no longer needed
+                self.slack_worker.cancel()
+
+            # get anything the task did not get to
+            batch: list = []
+
+            while not self.slack_queue.empty():
+                batch.append(self.slack_queue.get_nowait())
+
+            try:
+                # send the rest of the messages directly
+                if batch:
+                    await asyncio.to_thread(self.post_slack_batch, batch)
+            except Exception:
+                # do not hide the reason for the shutdown
+                self.logger.exception('Error sending %s remaining Slack messages.', len(batch))
 
     @staticmethod
     def get_run_time_delta(run: dict) -> str:
@@ -110,11 +284,11 @@ class Utils:
         :param run:
         :return:
         """
-        # get the time difference
-        delta = dt.datetime.now() - run['run-start']
+        # get the time difference. the run start is a monotonic clock reading so wall clock changes do not skew it
+        delta = time.monotonic() - run['run-start']
 
         # get it into minutes and seconds
-        minutes = divmod(delta.seconds, 60)
+        minutes = divmod(int(delta), 60)
 
         # return the duration to the caller
         return f'in {minutes[0]} minutes, {minutes[1]} seconds'
@@ -12,12 +12,19 @@
     Author: Phil Owen, RENCI.org
 """
 
-import time
+import re
+import logging
+import threading
+from itertools import chain
 
-from kubernetes import client, config
+from kubernetes import client
 from src.common.logger import LoggingUtil
 from src.common.job_enums import JobType, JobStatus
 from src.common.utils import Utils
+from src.supervisor.k8s_config import K8sConfig
+
+# parses a k8s resource quantity (e.g. 512Mi, 250m) into its value and units
+QUANTITY_PATTERN = re.compile(r'(\d+)(\D*)')
 
 
 class JobCreate:
@@ -51,6 +58,13 @@ class JobCreate:
         # get the flag that indicates if there are cpu resource limits
         self.cpu_limits: bool = self.k8s_base_config.get("CPU_LIMITS")
 
+        # init the k8s API hook. it is created on first use, once the k8s configuration is loaded
+        self.api_instance = None
+        self.api_lock = threading.Lock()
+
+        # init the file server volume declarations. these volumes are shared by every run, so they are built once per volume name and mount path
+        self.filesvr_volume_cache: dict = {}
+
         # declare the secret environment variables
         self.secret_env_params: list = [{'name': 'LOG_LEVEL', 'key': 'log-level'}, {'name': 'LOG_PATH', 'key': 'log-path'},
                                         {'name': 'ASGS_DB_HOST', 'key': 'apsviz-host'}, {'name': 'ASGS_DB_PORT', 'key': 'apsviz-port'},
@@ -91,6 +105,31 @@ class JobCreate:
                                         {'name': 'PSC_SYNC_PROJECTS', 'key': 'psc_sync_projects'}, {'name': 'UI_DATA_URL', 'key': 'ui-data-url'},
                                         {'name': 'AST_IO_RETRY_PAUSE', 'key': 'ast-io-retry-pause'}, {'name': 'SYSTEM', 'key': 'system'}]
 
+        # build the secret environment variables once. load geo can't use the http_proxy values, so it gets a list without them
+        self.secret_envs_no_proxy: list = [client.V1EnvVar(name=item['name'], value_from=client.V1EnvVarSource(
+            secret_key_ref=client.V1SecretKeySelector(name='eds-keys', key=item['key']))) for item in self.secret_env_params]
+
+        # all other jobs get the proxy values added to the env params
+        self.secret_envs: list = self.secret_envs_no_proxy + [client.V1EnvVar(name=name, value_from=client.V1EnvVarSource(
+            secret_key_ref=client.V1SecretKeySelector(name='eds-keys', key='http-proxy-url')))
+            for name in ('http_proxy', 'https_proxy', 'HTTP_PROXY', 'HTTPS_PROXY')]
+
+    def get_resource_limit(self, quantity: str) -> str:
+        """
+        gets a resource limit that is "self.limit_multiplier" greater than the requested quantity
+
+        :param quantity: the requested k8s resource quantity
+        :return: the resource limit in the same units
+        """
+        # split the quantity into the value and units
+        match = QUANTITY_PATTERN.match(quantity)
+
+        # get the requested value
+        value = int(match.group(1))
+
+        # return the limit to the caller
+        return f'{value + int(value * self.limit_multiplier)}{match.group(2)}'
+
     def create_job_object(self, run: dict, job_type: JobType, job_details: dict):
         """
         Creates a k8s job description object
@@ -104,105 +143,91 @@ class JobCreate:
         # get a reference to the job type
         run_job = run[job_type]
 
-        # declare the volume mounts
-        volumes = [client.V1Volume(name=run_job['run-config']['DATA_VOLUME_NAME'],
-                                   persistent_volume_claim=client.V1PersistentVolumeClaimVolumeSource(claim_name=f'{job_details["DATA_PVC_CLAIM"]}'))]
-        volume_mounts = [client.V1VolumeMount(name=run_job['run-config']['DATA_VOLUME_NAME'], mount_path=run_job['run-config']['DATA_MOUNT_PATH'])]
-
-        # if there is a desire to mount other persistent volumes
-        if run_job['run-config']['FILESVR_VOLUME_NAME']:
-            mount_paths = run_job['run-config']['FILESVR_MOUNT_PATH'].split(',')
-
-            for index, name in enumerate(run_job['run-config']['FILESVR_VOLUME_NAME'].split(',')):
-                # build the mounted volumes list
-                volumes.append(client.V1Volume(name=name, persistent_volume_claim=client.V1PersistentVolumeClaimVolumeSource(claim_name=name)))
-                volume_mounts.append(client.V1VolumeMount(name=name, mount_path=mount_paths[index]))
+        # get a reference to the run configuration of the job type
+        run_details = run_job['run-config']
+
+        # the volumes only depend on these run config values. job steps that share them reuse the volumes already built for the run
+        volume_key: tuple = (run_details['DATA_VOLUME_NAME'], run_details['DATA_MOUNT_PATH'], job_details['DATA_PVC_CLAIM'],
+                             run_details['FILESVR_VOLUME_NAME'], run_details['FILESVR_MOUNT_PATH'])
+
+        # get the volumes built earlier in the run if there are any
+        volume_cache: dict = run.setdefault('volume-cache', {})
+
+        # if these volumes have not been built yet for this run
+        if volume_key not in volume_cache:
+            # declare the volume mounts
+            volumes = [client.V1Volume(name=run_details['DATA_VOLUME_NAME'],
+                                       persistent_volume_claim=client.V1PersistentVolumeClaimVolumeSource(
+                                           claim_name=f'{job_details["DATA_PVC_CLAIM"]}'))]
+            volume_mounts = [client.V1VolumeMount(name=run_details['DATA_VOLUME_NAME'],
+                                                  mount_path=run_details['DATA_MOUNT_PATH'])]
+
+            # if there is a desire to mount other persistent volumes
+            if run_details['FILESVR_VOLUME_NAME']:
+                # pair each volume with its mount path. the lists must be the same length or the job definition is in error
+                for name, mount_path in zip(run_details['FILESVR_VOLUME_NAME'].split(','),
+                                            run_details['FILESVR_MOUNT_PATH'].split(','), strict=True):
+                    # get the volume declarations, building them if this volume has not been seen before
+                    if (name, mount_path) not in self.filesvr_volume_cache:
+                        self.filesvr_volume_cache[(name, mount_path)] = (
+                            client.V1Volume(name=name, persistent_volume_claim=client.V1PersistentVolumeClaimVolumeSource(claim_name=name)),
+                            client.V1VolumeMount(name=name, mount_path=mount_path))
+
+                    # build the mounted volumes list
+                    volume, volume_mount = self.filesvr_volume_cache[(name, mount_path)]
+                    volumes.append(volume)
+                    volume_mounts.append(volume_mount)
+
+            # save the volumes for the other job steps in the run
+            volume_cache[volume_key] = (volumes, volume_mounts)
+
+        # get the volumes for this job
+        volumes, volume_mounts = volume_cache[volume_key]
 
         # get the ephemeral limit
-        if run_job['run-config']['EPHEMERAL'] is not None:
-            ephemeral_limit = run_job['run-config']['EPHEMERAL']
+        if run_details['EPHEMERAL'] is not None:
+            ephemeral_limit = run_details['EPHEMERAL']
         else:
             ephemeral_limit = '128Mi'
 
-        # declare an array for the env declarations
-        secret_envs = []
+        # get the prebuilt env declarations. load geo can't use the http_proxy values
+        secret_envs: list = self.secret_envs_no_proxy if job_type in (JobType.LOAD_GEO_SERVER, JobType.LOAD_GEO_SERVER_S3) else self.secret_envs
 
-        # duplicate the environment param list
-        secret_env_params = self.secret_env_params.copy()
+        # init a list for all the containers in this job
+        containers: list = []
 
-        # load geo can't use the http_proxy values
-        if job_type not in (JobType.LOAD_GEO_SERVER, JobType.LOAD_GEO_SERVER_S3):
-            # add the proxy values to the env param list
-            secret_env_params.extend([{'name': 'http_proxy', 'key': 'http-proxy-url'}, {'name': 'https_proxy', 'key': 'http-proxy-url'},
-                                      {'name': 'HTTP_PROXY', 'key': 'http-proxy-url'}, {'name': 'HTTPS_PROXY', 'key': 'http-proxy-url'}])
+        # init the restart policy for the job. set this to "Never" in the DB when troubleshooting pod issues
+        restart_policy = run_details['RESTART_POLICY'] if run_details['COMMAND_MATRIX'] else 'Never'
 
-        # get all the env params into an array
-        for item in secret_env_params:
-            secret_envs.append(client.V1EnvVar(name=item['name'], value_from=client.V1EnvVarSource(
-                secret_key_ref=client.V1SecretKeySelector(name='eds-keys', key=item['key']))))
+        # use the cpus defined in the DB if they exist. the default should never happen if the DB is set up properly
+        cpus = run_details['CPUS'] if run_details['CPUS'] else '250m'
 
-        # init a list for all the containers in this job
-        containers: list = []
+        # get the baseline set of container resources. this is done to make the memory limit "self.limit_multiplier" greater than what is requested.
+        # all the containers in the job use the same resources
+        resources = {'limits': {'memory': self.get_resource_limit(run_details['MEMORY']), 'ephemeral-storage': ephemeral_limit},
+                     'requests': {'cpu': cpus, 'memory': run_details['MEMORY'], 'ephemeral-storage': '64Mi'}}
 
-        # init the restart policy for the job
-        restart_policy = 'Never'
+        # if there is a cpu limit restriction add it to the resource spec
+        if self.cpu_limits:
+            # this is done to make sure that cpu limit is some percentage greater than what is created
+            resources['limits'].update({'cpu': self.get_resource_limit(cpus)})
+
+        # get the container settings that are the same for every container in the job. only the name and command vary
+        container_settings: dict = {'image': run_details['IMAGE'], 'volume_mounts': volume_mounts, 'image_pull_policy': 'Always', 'env': secret_envs,
+                                    'resources': resources}
 
         # add on the resources
-        for idx, item in enumerate(run_job['run-config']['COMMAND_MATRIX']):
-            # get the base command line
-            new_cmd_list: list = run_job['run-config']['COMMAND_LINE'].copy()
-
-            # add the command matrix value
-            new_cmd_list.extend(item)
-
-            # this is done to make the memory limit "self.limit_multiplier" greater than what is requested
-            memory_val_txt = ''.join(x for x in run_job['run-config']['MEMORY'] if x.isdigit())
-            memory_unit_txt = ''.join(x for x in run_job['run-config']['MEMORY'] if not x.isdigit())
-            memory_limit_val = int(memory_val_txt) + int((int(memory_val_txt) * self.limit_multiplier))
-            memory_limit = f'{memory_limit_val}{memory_unit_txt}'
-
-            # use what is defined in the DB if it exists
-            if run_job['run-config']['CPUS']:
-                cpus = run_job['run-config']['CPUS']
-            # this should never happen if the DB is set up properly
-            else:
-                cpus = '250m'
-
-            # set this to "Never" when troubleshooting pod issues
-            restart_policy = run_job['run-config']['RESTART_POLICY']
-
-            # get the baseline set of container resources
-            resources = {'limits': {'memory': memory_limit, 'ephemeral-storage': ephemeral_limit},
-                         'requests': {'cpu': cpus, 'memory': run_job['run-config']['MEMORY'], 'ephemeral-storage': '64Mi'}}
-
-            # if there is a cpu limit restriction add it to the resource spec
-            if self.cpu_limits:
-                # parse the cpu text
-                cpu_val_txt = ''.join(x for x in cpus if x.isdigit())
-                cpu_unit_txt = ''.join(x for x in cpus if not x.isdigit())
-
-                # this is done to make sure that cpu limit is some percentage greater than what is created
-                cpus_limit_val = int(cpu_val_txt) + int((int(cpu_val_txt) * self.limit_multiplier))
-
-                # create the cpu specification
-                cpus_limit = f'{cpus_limit_val}{cpu_unit_txt}'
-
-                # append the limit onto the specification
-                resources['limits'].update({'cpu': cpus_limit})
-
-            # remove any empty elements. this becomes important when setting the pod into a loop
-            # see get_base_command_line() in the job supervisor code
-            if '' in new_cmd_list:
-                new_cmd_list.remove('')
-
-            # output the command line for debug runs
-            if run['debug'] is True:
+        for idx, item in enumerate(run_details['COMMAND_MATRIX']):
+            # build the base command line plus the command matrix value in one pass, dropping any empty elements.
+            # this becomes important when setting the pod into a loop. see get_base_command_line() in the job supervisor code
+            new_cmd_list: list = [arg for arg in chain(run_details['COMMAND_LINE'], item) if arg != '']
+
+            # output the command line for debug runs. skip building the text if it would not be logged
+            if run['debug'] is True and self.logger.isEnabledFor(logging.INFO):
                 self.logger.info('command line: %s', " ".join(new_cmd_list))
 
             # add the container to the list
-            containers.append(client.V1Container(name=run_job['run-config']['JOB_NAME'] + '-' + str(idx), image=run_job['run-config']['IMAGE'],
-                                                 command=new_cmd_list, volume_mounts=volume_mounts, image_pull_policy='Always', env=secret_envs,
-                                                 resources=resources))
+            containers.append(client.V1Container(name=f"{run_details['JOB_NAME']}-{idx}", command=new_cmd_list, **container_settings))
 
         # save the number of containers in this job/pod for status checking later
         run_job['total_containers'] = len(containers)
@@ -212,9 +237,9 @@ class JobCreate:
         pod_affinity_selector = None
 
         # if there was a node selector found use it (AWS runs)
-        if run_job['run-config']['NODE_TYPE']:
+        if run_details['NODE_TYPE']:
             # separate the tag and type
-            params = run_job['run-config']['NODE_TYPE'].split(':')
+            params = run_details['NODE_TYPE'].split(':')
 
             # set the pod node selector
             pod_node_selector = {params[0]: params[1]}
@@ -228,7 +253,8 @@ class JobCreate:
         #                                                                                                                         "k8s-node10"])])])))
 
         # create and configure a spec section for the container
-        template = client.V1PodTemplateSpec(metadata=client.V1ObjectMeta(labels={"app": run_job['run-config']['JOB_NAME']}),
+        template = client.V1PodTemplateSpec(metadata=client.V1ObjectMeta(labels={"app": run_details['JOB_NAME'],
+                                                                                     "apsviz-supervisor": "true"}),
                                             spec=client.V1PodSpec(restart_policy=restart_policy, containers=containers, volumes=volumes,
                                                                   node_selector=pod_node_selector, affinity=pod_affinity_selector))
 
@@ -236,11 +262,31 @@ class JobCreate:
         job_spec = client.V1JobSpec(template=template, backoff_limit=self.back_off_limit, ttl_seconds_after_finished=self.job_timeout)
 
         # instantiate the job object
-        job = client.V1Job(api_version="batch/v1", kind="Job", metadata=client.V1ObjectMeta(name=run_job['run-config']['JOB_NAME']), spec=job_spec)
+        job = client.V1Job(api_version="batch/v1", kind="Job", metadata=client.V1ObjectMeta(name=run_details['JOB_NAME']), spec=job_spec)
 
         # save these params onto the run info
         run_job['job-config'] = {'job': job, 'job-details': job_details, 'job_id': '?'}
 
+    def get_api_instance(self) -> client.BatchV1Api:
+        """
+        gets the k8s API hook. the k8s configuration is loaded and the hook is created once and
+        reused for all the k8s calls.
+
+        :return: client.BatchV1Api, the API hook
+        """
+        # jobs may be created from several threads at once, only let one of them set things up
+        with self.api_lock:
+            # if the API hook has not been created yet
+            if self.api_instance is None:
+                # load the k8s configuration
+                K8sConfig.load_k8s_config(self.k8s_base_config['CLUSTER'])
+
+                # create the API hook
+                self.api_instance = client.BatchV1Api()
+
+        # return the API hook to the caller
+        return self.api_instance
+
     def create_job(self, run: dict, job_type: JobType) -> object:
         """
         creates the k8s job
@@ -249,13 +295,14 @@ class JobCreate:
         :param job_type:
         :return: str the job id
         """
-        # create the API hooks
-        api_instance = client.BatchV1Api()
+        # get the API hook
+        api_instance = self.get_api_instance()
 
         # get references to places in the config to make things more readable
-        job_data = run[job_type]['job-config']
+        run_job = run[job_type]
+        job_data = run_job['job-config']
         job_details = job_data['job-details']
-        run_details = run[job_type]['run-config']
+        run_details = run_job['run-config']
 
         # init the return storage
         job_id: str = ''
@@ -263,29 +310,16 @@ class JobCreate:
         if not run['fake-jobs']:
             try:
                 # create the job
-                api_instance.create_namespaced_job(body=job_data['job'], namespace=job_details['NAMESPACE'])
+                job = api_instance.create_namespaced_job(body=job_data['job'], namespace=job_details['NAMESPACE'])
             except client.ApiException:
                 self.logger.exception("Error creating job: %s", run_details['JOB_NAME'])
                 return None
 
-            # wait a period of time for the next check
-            time.sleep(job_data['job-details']['CREATE_SLEEP'])
+            # the API server returns the created job. its uid is the value k8s puts in the controller-uid label, so there is no need to
+            # wait for the job to show up in a job listing
+            job_id = str(job.metadata.uid)
 
-            # get the job run information
-            jobs = api_instance.list_namespaced_job(namespace=job_details['NAMESPACE'])
-
-            # for each item returned
-            for job in jobs.items:
-                # is this the one that was launched
-                if 'app' in job.metadata.labels and job.metadata.labels['app'] == run_details['JOB_NAME']:
-                    self.logger.debug("Found new job: %s, controller-uid: %s, status: %s", run_details['JOB_NAME'],
-                                      job.metadata.labels['controller-uid'], job.status.active)
-
-                    # save job id
-                    job_id = str(job.metadata.labels["controller-uid"])
-
-                    # no need to continue looking
-                    break
+            self.logger.debug("Created new job: %s, controller-uid: %s", run_details['JOB_NAME'], job_id)
         else:
             job_id = 'fake-job-' + job_type
 
@@ -293,42 +327,53 @@ class JobCreate:
         return job_id
 
     # @staticmethod
-    def delete_job(self, run: dict) -> str:
+    def delete_job(self, run: dict) -> (bool, str):
         """
-        deletes the k8s job
+        deletes the k8s job. the job and pod failure states come from the job find status, not from here.
 
         :param run: the run configuration details
-        :return:
+        :return: a flag indicating the job was removed and the status of the delete request
         """
+        # init the success flag
+        job_deleted: bool = True
+
         # if this is a debug run or if an error was detected keep the jobs available for interrogation
         # note: a duplicate name collision on the next run could occur if the jobs are not removed
         # before the same run is restarted.
         if not run['debug'] and run['status'] != JobStatus.ERROR:
-            job_data = run[run['job-type']]['job-config']
+            # get references to places in the config to make things more readable
+            run_job = run[run['job-type']]
+            job_data = run_job['job-config']
             job_details = job_data['job-details']
-            run_details = run[run['job-type']]['run-config']
+            run_details = run_job['run-config']
 
-            # create an API hook
-            api_instance = client.BatchV1Api()
+            # get the API hook
+            api_instance = self.get_api_instance()
 
             try:
-                # remove the job
+                # remove the job. the pods are removed by the k8s garbage collector in the background so this does not wait on them
                 api_response = api_instance.delete_namespaced_job(name=run_details['JOB_NAME'], namespace=job_details['NAMESPACE'],
-                                                                  body=client.V1DeleteOptions(propagation_policy='Foreground',
+                                                                  body=client.V1DeleteOptions(propagation_policy='Background',
                                                                                               grace_period_seconds=5))
 
                 # set the return value
                 ret_val = api_response.status
 
+                # a background delete returns a Success status once the job has been removed
+                job_deleted = ret_val != 'Failure'
+
             # trap any k8s call errors
             except Exception:
                 ret_val = "Job delete error, job may no longer exist."
                 self.logger.exception("%s", ret_val)
+
+                # the job was not removed
+                job_deleted = False
         else:
             ret_val = 'success'
 
-        # return the final status of the job
-        return ret_val
+        # return the success flag and the status of the delete request
+        return job_deleted, ret_val
 
     def execute(self, run: dict, job_type: JobType):
         """
@@ -345,17 +390,6 @@ class JobCreate:
         # load the baseline config params
         job_details = self.k8s_base_config
 
-        # load the k8s configuration
-        try:
-            # first try to get the config if this is running on the cluster
-            config.load_incluster_config()
-        except Exception:
-            try:
-                # else get the local config. this local config must match the cluster name in your k8s config
-                config.load_kube_config(context=job_details['CLUSTER'])
-            except config.ConfigException as exc:
-                raise Exception("Could not configure kubernetes python client") from exc
-
         # create the job object
         self.create_job_object(run, job_type, job_details)
 
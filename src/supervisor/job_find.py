@@ -12,8 +12,9 @@
     Author: Phil Owen, RENCI.org
 """
 
-from kubernetes import client, config
+from kubernetes import client
 from src.common.logger import LoggingUtil
+from src.supervisor.k8s_config import K8sConfig
 
 
 class JobFind:
@@ -31,78 +32,124 @@ class JobFind:
         # create a logger
         self.logger = LoggingUtil.init_logging("APSVIZ.Supervisor.JobFind", level=log_level, line_format='medium', log_file_path=log_path)
 
-    def find_job_info(self, run: dict) -> (bool, str, str):
+        # init the k8s API hook. it is created on first use, once the k8s configuration is loaded
+        self.api_instance = None
+
+    @staticmethod
+    def get_job_state(job_status) -> (str, str):
         """
-        method to gather the k8s job information
+        gets the job and pod status from a k8s job status
 
-        :param run:
-        :return:
+        :param job_status: the k8s job status
+        :return: the job status and pod status
         """
-        # load the baseline cluster params
-        job_details = run[run['job-type']]['job-config']['job-details']
-        job_name = run[run['job-type']]['run-config']['JOB_NAME']
+        # is the job running
+        if job_status.active:
+            ret_val = ('Running', '')
+        # did the job fail
+        elif job_status.failed:
+            ret_val = ('Failed', 'Failed')
+        # did the job succeed
+        elif job_status.succeeded:
+            ret_val = ('Complete', 'Succeeded')
+        # else the job has not started yet
+        else:
+            ret_val = ('Pending', '')
 
-        # if this is not a fake job
-        if not run['fake-jobs']:
-            # load the k8s configuration
-            try:
-                # first try to get the config if this is running on the cluster
-                config.load_incluster_config()
-            except config.ConfigException:
-                try:
-                    # else get the local config
-                    config.load_kube_config(context=job_details['CLUSTER'])
-                except config.ConfigException as exc:
-                    raise Exception("Could not configure kubernetes python client") from exc
+        # return the job status and pod status
+        return ret_val
+
+    def find_all_job_info(self, namespace: str, cluster: str, job_names: list) -> dict:
+        """
+        gathers the k8s job information for all the supervisor jobs in a single k8s API call
+
+        jobs launched before the supervisor labelled its jobs are not in that list. any of the expected
+        jobs that are missing from it are looked up by name.
 
-            # create the API hooks
-            api_instance = client.BatchV1Api()
+        :param namespace: the k8s namespace the jobs run in
+        :param cluster: the cluster context to use if this is not running on the cluster
+        :param job_names: the names of the jobs the runs in progress are waiting on
+        :return: dict of job name to job status and pod status, None on error
+        """
+        # init the return
+        job_info: dict = {}
 
-            # init the status storage
-            job_found: bool = False
-            job_status: str = ''
-            pod_status: str = ''
+        try:
+            # if the API hook has not been created yet
+            if self.api_instance is None:
+                # load the k8s configuration
+                K8sConfig.load_k8s_config(cluster)
 
-            # get the job run information
-            jobs = api_instance.list_namespaced_job(namespace=job_details['NAMESPACE'])
+                # create the API hook. it is reused on every pass so its connection pool is kept
+                self.api_instance = client.BatchV1Api()
 
-            # init the job status
-            job_status: str = 'Pending'
+            # get the job run information for the jobs launched by the supervisor
+            jobs = self.api_instance.list_namespaced_job(namespace=namespace, label_selector='apsviz-supervisor=true')
 
             # for each item returned
             for job in jobs.items:
+                # get the job name
+                job_name = job.metadata.labels.get('job-name')
+
                 # is this a valid job
-                if 'job-name' not in job.metadata.labels:
+                if job_name is None:
                     self.logger.error('Job with no "job-name" label element detected while looking in %s', job)
-                # is this the one that was launched
-                elif job.metadata.labels['job-name'] == job_name:
-                    # set the job found flag
-                    job_found = True
-
-                    self.logger.debug('Found job: %s, controller-uid: %s, status: %s', job_name, job.metadata.labels["controller-uid"],
-                                      job.status.active)
-
-                    if job.status.active:
-                        # set the job status
-                        job_status = 'Running'
-                    # did the job finish
-                    else:
-                        # did the job fail
-                        if job.status.failed:
-                            job_status = 'Failed'
-                            pod_status = 'Failed'
-                        # did the job succeed
-                        elif job.status.succeeded:
-                            pod_status = 'Succeeded'
-                            job_status = 'Complete'
-
-                        # no need to continue if the job was found and interrogated
-                        break
+                    continue
+
+                self.logger.debug('Found job: %s, controller-uid: %s, status: %s', job_name, job.metadata.labels.get('controller-uid'),
+                                  job.status.active)
+
+                # save the job and pod status
+                job_info[job_name] = self.get_job_state(job.status)
+
+            # look up the expected jobs that were not in the labelled list
+            for job_name in set(job_names) - job_info.keys():
+                try:
+                    # get the job by name
+                    job = self.api_instance.read_namespaced_job(name=job_name, namespace=namespace)
+                except client.ApiException as exc:
+                    # a job that does not exist is reported as not found by the caller
+                    if exc.status != 404:
+                        self.logger.exception("Error getting job %s in namespace: %s", job_name, namespace)
+
+                    continue
+
+                self.logger.debug('Found unlabelled job: %s, status: %s', job_name, job.status.active)
+
+                # save the job and pod status
+                job_info[job_name] = self.get_job_state(job.status)
+
+        # trap any k8s config, API or connection errors. the runs are checked again on the next pass
+        except Exception:
+            self.logger.exception("Error getting the job list in namespace: %s", namespace)
+            job_info = None
+
+        # return the job status and pod status for each job
+        return job_info
+
+    def find_job_info(self, run: dict, job_info: dict) -> (bool, str, str):
+        """
+        method to get the k8s job information for a run
+
+        :param run:
+        :param job_info: the job information gathered by find_all_job_info()
+        :return:
+        """
+        # if this is not a fake job
+        if not run['fake-jobs']:
+            # get the job name
+            job_name = run[run['job-type']]['run-config']['JOB_NAME']
+
+            # was the job found
+            job_found: bool = job_name in job_info
+
+            # get the job and pod status
+            job_status, pod_status = job_info.get(job_name, ('', ''))
         # fake jobs get this return status
         else:
             job_found = True
             pod_status = 'Succeeded'
             job_status = 'Complete'
 
-        # return the job controller uid, job status and pod status
+        # return the job found flag, job status and pod status
         return job_found, job_status, pod_status
@@ -12,18 +12,52 @@
     Author: Phil Owen, RENCI.org
 """
 
-import time
 import os
+import time
+import asyncio
 import json
 import datetime as dt
+from copy import deepcopy
+from collections import deque
+from string import Formatter
+from concurrent.futures import ThreadPoolExecutor
 
 from src.supervisor.job_create import JobCreate
 from src.supervisor.job_find import JobFind
 from src.common.pg_impl import PGImplementation
 from src.common.logger import LoggingUtil
-from src.common.job_enums import JobType, JobStatus
+from src.common.job_enums import JobType, JobStatus, JOB_TYPE_VALUES
 from src.common.utils import Utils
 
+# the path to the pause file is fixed, so it is resolved once when the module loads
+PAUSE_PATH: str = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', '..', 'pause'))
+
+# the run params to look for. the dict keys act as an ordered set so the missing params can be found with a set difference
+REQUIRED_RUN_PARAMS: dict = dict.fromkeys(['supervisor_job_status', 'downloadurl', 'adcirc.gridname', 'instancename', 'stormnumber',
+                                           'physical_location'])
+
+# the command line templates and the extend the output path flag for each job type. the templates are filled in with the run
+# values in get_base_command_line()
+COMMAND_LINE_TEMPLATES: dict = {
+    JobType.STAGING: (['--inputURL', '{downloadurl}', '--isHurricane', '{stormnumber}', '--outputDir'], True),
+    JobType.HAZUS: (['--downloadurl', '{downloadurl}', '--datadir', '{run_path}'], False),
+    JobType.ADCIRC2COG_TIFF: (['--inputDIR', '{run_path}/input', '--outputDIR', '{run_path}{sub_path}', '--inputFile'], False),
+    JobType.GEOTIFF2COG: (['--inputDIR', '{run_path}/cogeo', '--finalDIR', '{run_path}/final{sub_path}', '--inputParam'], False),
+    JobType.LOAD_GEO_SERVER: (['--instanceId', '{run_id}'], False),
+    JobType.LOAD_GEO_SERVER_S3: (['--instanceId', '{run_id}', '--HECRAS_URL', '{downloadurl}'], False),
+    JobType.FINAL_STAGING: (['--inputDir', '{run_path}{sub_path}', '--outputDir', '{mount_path}{sub_path}', '--tarMeta', '{run_id}'], False),
+    JobType.OBS_MOD_AST: (['{thredds_url}', '{gridname}', '{run_path}/final{additional_path}', '{run_id}'], False),
+    JobType.AST_RUN_HARVESTER: (['{thredds_url}', '{mount_path}{sub_path}', '{run_id}'], False),
+    JobType.ADCIRCTIME_TO_COG: (['--inputDIR', '{run_path}/input', '--outputDIR', '{run_path}{sub_path}', '--finalDIR',
+                                 '{run_path}/final{sub_path}', '--inputFile'], False),
+    JobType.COLLAB_DATA_SYNC: (['--run_id', '{run_id}', '--physical_location', '{physical_location}'], False),
+    JobType.ADCIRC_TO_KALPANA_COG: (['--modelRunID', '{run_id}'], False),
+    JobType.TIMESERIESDB_INGEST: (['--modelRunID', '{run_id}'], False)}
+
+# the names of the run values each command line template uses, so only those values are looked up
+COMMAND_LINE_FIELDS: dict = {job_type: {field for param in template[0] for _, field, _, _ in Formatter().parse(param) if field}
+                             for job_type, template in COMMAND_LINE_TEMPLATES.items()}
+
 
 class JobSupervisor:
     """
@@ -48,195 +82,315 @@ class JobSupervisor:
         # create a logger
         self.logger = LoggingUtil.init_logging("APSVIZ.Supervisor.Jobs", level=log_level, line_format='medium', log_file_path=log_path)
 
-        # init the list of pending runs. this stores all job details of the run
-        self.run_list: list = []
+        # init the pending runs keyed by run id. this stores all job details of the run
+        self.run_list: dict = {}
 
         # load the base configuration params
         self.k8s_base_config: dict = Utils.get_base_config()
 
-        # init the running count of active runs
-        self.run_count: int = 0
-
         # init the k8s job configuration storage
         self.k8s_job_configs: dict = {}
 
+        # init the state of the run loop: the count of active runs, the count of passes in a row with nothing to do (used to back
+        # off the polling), the last time a run completed, the run status updates waiting to be written to the DB at the end of a pass
+        # and the cache of parsed job configurations with the time they expire
+        self.loop_state: dict = {'run_count': 0, 'no_activity_count': 0, 'last_run_time': dt.datetime.now(), 'pending_status_updates': {},
+                                 'job_config_cache': {'data': None, 'raw': None, 'expires': 0.0}}
+
         # specify the DB to get a connection
         # note the extra comma makes this single item a singleton tuple
         db_names: tuple = ('apsviz',)
 
         # assign utility objects
-        self.util_objs: dict = {'create': JobCreate(), 'k8s_find': JobFind(), 'pg_db': PGImplementation(db_names, _logger=self.logger),
-                                'utils': Utils(self.logger, self.system, self.app_version)}
-
-        # init the run params to look for list
-        self.required_run_params = ['supervisor_job_status', 'downloadurl', 'adcirc.gridname', 'instancename', 'stormnumber', 'physical_location']
+        self.k8s_create = JobCreate()
+        self.k8s_find = JobFind()
+        self.pg_db = PGImplementation(db_names, _logger=self.logger)
+        self.utils = Utils(self.logger, self.system, self.app_version)
 
         # debug options
         self.debug_options: dict = {'pause_mode': True, 'fake_job': False}
 
-        # init the last time a run completed
-        self.last_run_time = dt.datetime.now()
+        # init the new run notification state. the channel is the DB notification channel that announces new runs. if it is
+        # not set new runs are polled for on every pass. notified starts set to pick up any runs already waiting.
+        self.loop_state['new_runs'] = {'channel': self.k8s_base_config.get('NEW_RUN_CHANNEL'), 'notified': True, 'last_check': time.monotonic()}
+
+        # start listening for new run notifications
+        if self.loop_state['new_runs']['channel']:
+            self.pg_db.listen('apsviz', self.loop_state['new_runs']['channel'])
 
         # declare ready
         self.logger.info('The APSViz Job Supervisor:%s (%s) has initialized...', self.app_version, self.system)
 
     def get_job_configs(self) -> dict:
         """
-        gets the job configurations
+        gets the job configurations. the parsed configurations are cached for
+        JOB_CONFIG_TTL seconds so the DB is not queried on every pass. once expired, the
+        definitions are only parsed again if they changed in the DB.
+
+        note: the returned dict is shared, callers that modify it must make a copy.
 
         :return: Dict, baseline run params
         """
+        # use the cached configurations if they have not expired
+        if self.loop_state['job_config_cache']['data'] is not None and time.monotonic() < self.loop_state['job_config_cache']['expires']:
+            return self.loop_state['job_config_cache']['data']
+
         # get all the job parameter definitions
-        db_data = self.util_objs['pg_db'].get_job_defs()
+        db_data = self.pg_db.get_job_defs()
 
         # init the return
         job_config_data: dict = {}
 
+        # if the definitions have not changed since they were last parsed, reuse the parsed configurations
+        if self.loop_state['job_config_cache']['data'] is not None and db_data == self.loop_state['job_config_cache']['raw']:
+            # get the cached configurations
+            job_config_data = self.loop_state['job_config_cache']['data']
+
+            # restart the cache timer
+            self.loop_state['job_config_cache']['expires'] = time.monotonic() + self.k8s_base_config.get('JOB_CONFIG_TTL', 60)
+
         # make sure we got a list of config data items
-        if isinstance(db_data, list):
+        elif isinstance(db_data, list):
+            # save an unparsed copy of the definitions to detect changes on the next reload
+            raw_data: list = deepcopy(db_data)
+
+            # the workflow definitions changed so the first job in each workflow may have as well
+            self.pg_db.clear_first_job_cache()
+
             # for each step in the workflow
             for workflow_item in db_data:
                 # get the workflow type name
-                workflow_type = list(workflow_item.keys())[0]
+                workflow_type = next(iter(workflow_item))
+
+                # init the job defs for the workflow
+                workflow_jobs: dict = {}
 
-                # get the data looking like something we are used to
-                job_config_data[workflow_type] = {list(x)[0]: x.get(list(x)[0]) for x in workflow_item[workflow_type]}
+                # get the data looking like something we are used to in a single pass
+                for job_item in workflow_item[workflow_type]:
+                    # get the job name and definition
+                    job_name = next(iter(job_item))
+                    job_def = job_item[job_name]
 
-                # fix the arrays for each job def. they come in as a string
-                for item in job_config_data[workflow_type].items():
-                    item[1]['COMMAND_LINE'] = json.loads(item[1]['COMMAND_LINE'])
-                    item[1]['COMMAND_MATRIX'] = json.loads(item[1]['COMMAND_MATRIX'])
-                    item[1]['PARALLEL'] = [JobType(x) for x in json.loads(item[1]['PARALLEL'])] if item[1]['PARALLEL'] is not None else None
+                    # fix the arrays for each job def. they come in as a string
+                    job_def['COMMAND_LINE'] = json.loads(job_def['COMMAND_LINE'])
+                    job_def['COMMAND_MATRIX'] = json.loads(job_def['COMMAND_MATRIX'])
+                    job_def['PARALLEL'] = [JOB_TYPE_VALUES[x] for x in json.loads(job_def['PARALLEL'])] if job_def['PARALLEL'] is not None else None
+
+                    # save the job def
+                    workflow_jobs[job_name] = job_def
+
+                # save the workflow job defs
+                job_config_data[workflow_type] = workflow_jobs
+
+            # cache the configurations
+            self.loop_state['job_config_cache'].update({'data': job_config_data, 'raw': raw_data,
+                                                        'expires': time.monotonic() + self.k8s_base_config.get('JOB_CONFIG_TTL', 60)})
 
         # return the config data
         return job_config_data
 
-    def run(self):
+    def invalidate_job_configs(self):
+        """
+        forces the job configurations to be reloaded from the DB on the next request
+
+        :return: nothing
         """
-        endless loop processing run requests
+        self.loop_state['job_config_cache']['expires'] = 0.0
+
+    async def run(self):
+        """
+        runs the supervisor until it is stopped. any Slack messages still queued are sent and the worker
+        threads are shut down before returning, even when the supervisor is stopping because of an error.
 
         :return: nothing
         """
-        # init counter that indicates how many times nothing was launched.
-        # used to slow down the checks that look for work
-        no_activity_counter: int = 0
+        # the blocking k8s and DB calls are run on the loop's default executor. size it from the config so
+        # the job creations fanned out across runs and job steps overlap without flooding the k8s API server
+        executor = ThreadPoolExecutor(max_workers=self.k8s_base_config.get('K8S_MAX_WORKERS', 8), thread_name_prefix='supervisor')
+        asyncio.get_running_loop().set_default_executor(executor)
+
+        try:
+            # process the runs
+            await self.process_runs()
+        finally:
+            # send any messages that are still waiting. this uses the executor, so it is done first
+            await self.utils.flush_slack_msgs()
+
+            # stop the worker threads
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def process_runs(self):
+        """
+        endless loop processing run requests. each pass fans out the handling of every
+        run in progress onto the event loop so that the runs progress concurrently.
 
+        :return: nothing
+        """
         # until the end of time
         while True:
             # get the incomplete runs from the database
-            self.get_incomplete_runs()
-
-            # reset the activity flag
-            no_activity: bool = True
-
-            # for each run returned from the database
-            for run in self.run_list:
-                # catch cleanup exceptions
-                try:
-                    # skip this job if it is complete
-                    if run['job-type'] == JobType.COMPLETE:
-                        self.handle_job_complete(run)
+            await self.get_incomplete_runs()
 
-                        # continue processing
-                        continue
+            # init the k8s job information
+            job_info: dict = {}
 
-                    # or an error
-                    if run['job-type'] == JobType.ERROR:
-                        self.handle_job_error(run)
+            # get the names of the k8s jobs the runs in progress are waiting on
+            job_names: list = [run[run['job-type']]['run-config']['JOB_NAME'] for run in self.run_list.values()
+                               if run['status'] == JobStatus.RUNNING and not run['fake-jobs']]
 
-                        # continue processing runs
-                        continue
-                except Exception:
-                    # report the exception
-                    self.logger.exception("Cleanup exception detected, id: %s", run['id'])
+            # get the state of all the k8s jobs in one call if there are any jobs running
+            if job_names:
+                job_info = await asyncio.to_thread(self.k8s_find.find_all_job_info, self.k8s_base_config['NAMESPACE'],
+                                                   self.k8s_base_config['CLUSTER'], job_names)
 
-                    msg = 'Exception caught. Terminating run.'
+            # handle each run concurrently. a snapshot of the list is used as runs get removed when they finish
+            run_activity: list = await asyncio.gather(*(self.process_run(run, job_info) for run in list(self.run_list.values())))
 
-                    # send the message
-                    self.util_objs['utils'].send_slack_msg(run['id'], msg, 'slack_issues_channel', run['debug'], run['instance_name'])
+            # there was no activity if no run reported any
+            no_activity: bool = all(run_activity)
 
-                    # remove the run
-                    self.run_list.remove(run)
-
-                    # continue processing runs
-                    continue
-
-                # catch handling the run exceptions
-                try:
-                    # handle the run
-                    no_activity = self.handle_run(run)
-                except Exception:
-                    # report the exception
-                    self.logger.exception("Run handler exception detected, id: %s", run['id'])
-
-                    # prepare the DB status
-                    run['status_prov'] += ', Run handler error detected'
-                    self.util_objs['pg_db'].update_job_status(run['id'], run['status_prov'])
-
-                    # delete the k8s job if it exists
-                    job_del_status = self.util_objs['create'].delete_job(run)
-
-                    # if there was a job error
-                    if job_del_status == '{}' or job_del_status.find('Failed') != -1:
-                        self.logger.error("Error failed %s run. Run ID: %s, Job type: %s, job delete status: %s", run['physical_location'], run['id'],
-                                          run['job-type'], job_del_status)
-
-                    # set error conditions
-                    run['job-type'] = JobType.ERROR
-                    run['status'] = JobStatus.ERROR
-
-                    # continue processing runs
-                    continue
+            # write the run status changes from this pass to the DB
+            await asyncio.to_thread(self.flush_run_status)
 
             # output the current number of runs in progress if there are any
-            if self.run_count != len(self.run_list):
+            if self.loop_state['run_count'] != len(self.run_list):
                 # save the new run count
-                self.run_count = len(self.run_list)
-                msg = f'There {"are" if self.run_count != 1 else "is"} {self.run_count} ' \
-                      f'run{"s" if self.run_count != 1 else ""} in progress.'
-                self.logger.info(msg)
+                self.loop_state['run_count'] = len(self.run_list)
+                self.logger.info('There is %s run in progress.' if self.loop_state['run_count'] == 1 else 'There are %s runs in progress.',
+                                 self.loop_state['run_count'])
 
             # was there any activity
             if no_activity:
                 # increment the counter
-                no_activity_counter += 1
+                self.loop_state['no_activity_count'] += 1
 
                 # check to see if it has been too long for a run
-                self.last_run_time = self.util_objs['utils'].check_last_run_time(self.last_run_time)
+                self.loop_state['last_run_time'] = await asyncio.to_thread(self.utils.check_last_run_time, self.loop_state['last_run_time'])
             else:
                 # clear the counter
-                no_activity_counter = 0
+                self.loop_state['no_activity_count'] = 0
 
                 # reset the last run timer
-                self.last_run_time = dt.datetime.now()
+                self.loop_state['last_run_time'] = dt.datetime.now()
 
-            # check for something to do after a period of time
-            if no_activity_counter >= self.k8s_base_config.get("MAX_NO_ACTIVITY_COUNT"):
-                # set the sleep timeout
-                sleep_timeout = self.k8s_base_config.get("POLL_LONG_SLEEP")
-
-                # try again at this poll rate
-                no_activity_counter = self.k8s_base_config.get("MAX_NO_ACTIVITY_COUNT") - 1
-            else:
-                # set the sleep timeout
-                sleep_timeout = self.k8s_base_config.get("POLL_SHORT_SLEEP")
+            # get how long to wait before the next pass
+            sleep_timeout = self.get_sleep_timeout()
 
             self.logger.debug("All active run checks complete. Sleeping for %s minutes.", sleep_timeout / 60)
 
             # wait for the next check for something to do
-            time.sleep(sleep_timeout)
+            if self.loop_state['new_runs']['channel']:
+                # wake up early if a new run is announced
+                if await asyncio.to_thread(self.pg_db.wait_for_notify, sleep_timeout):
+                    self.loop_state['new_runs']['notified'] = True
+            else:
+                await asyncio.sleep(sleep_timeout)
+
+    def get_sleep_timeout(self) -> int:
+        """
+        gets the time to wait before the next pass. after a period of time with nothing to do the sleep
+        doubles on each idle pass until it reaches the long poll rate. any activity resets it.
+
+        :return: the number of seconds to sleep
+        """
+        # back off after a period of time with nothing to do
+        if self.loop_state['no_activity_count'] >= self.k8s_base_config.get("MAX_NO_ACTIVITY_COUNT"):
+            # get the number of idle passes past the limit
+            backoff_count: int = self.loop_state['no_activity_count'] - self.k8s_base_config.get("MAX_NO_ACTIVITY_COUNT") + 1
+
+            # set the sleep timeout
+            sleep_timeout = min(self.k8s_base_config.get("POLL_LONG_SLEEP"), self.k8s_base_config.get("POLL_SHORT_SLEEP") * 2 ** backoff_count)
+
+            # once at the long poll rate try again at this poll rate
+            if sleep_timeout >= self.k8s_base_config.get("POLL_LONG_SLEEP"):
+                self.loop_state['no_activity_count'] -= 1
+        else:
+            # set the sleep timeout
+            sleep_timeout = self.k8s_base_config.get("POLL_SHORT_SLEEP")
+
+        # return to the caller
+        return sleep_timeout
+
+    async def process_run(self, run: dict, job_info: dict) -> bool:
+        """
+        handles a single run for this pass of the supervisor loop
+
+        :param run: the run parameters
+        :param job_info: the k8s job information for this pass
+        :return: boolean run activity indicator
+        """
+        # init the activity flag
+        no_activity: bool = True
+
+        # catch cleanup exceptions
+        try:
+            # handle the run if it is complete
+            if run['job-type'] == JobType.COMPLETE:
+                await self.handle_job_complete(run)
+
+                # nothing else to do for this run
+                return no_activity
+
+            # or an error
+            if run['job-type'] == JobType.ERROR:
+                await self.handle_job_error(run)
+
+                # nothing else to do for this run
+                return no_activity
+        except Exception:
+            # report the exception
+            self.logger.exception("Cleanup exception detected, id: %s", run['id'])
+
+            msg = 'Exception caught. Terminating run.'
+
+            # send the message
+            self.utils.queue_slack_msg(run['id'], msg, 'slack_issues_channel', debug_mode=run['debug'], instance_name=run['instance_name'])
+
+            # remove the run
+            del self.run_list[run['id']]
+
+            # nothing else to do for this run
+            return no_activity
+
+        # catch handling the run exceptions
+        try:
+            # handle the run
+            no_activity = await self.handle_run(run, job_info)
+        except Exception:
+            # report the exception
+            self.logger.exception("Run handler exception detected, id: %s", run['id'])
+
+            # prepare the DB status
+            run['status_prov'].append('Run handler error detected')
+            self.update_run_status(run)
+
+            # delete the k8s job if it exists
+            await self.delete_run_job(run)
+
+            # set error conditions
+            run['job-type'] = JobType.ERROR
+            run['status'] = JobStatus.ERROR
+
+            # reload the job configurations on the next pass in case they were the cause
+            self.invalidate_job_configs()
+
+        # return to the caller
+        return no_activity
 
-    def handle_job_error(self, run: dict):
+    async def handle_job_error(self, run: dict):
         """
         handles the job state when it is marked as in error
 
         :param run:
         :return:
         """
+        # flag the run as having had an error for the final report
+        run['has-error'] = True
+
         # does this run have a final staging step
         if 'final-staging' not in self.k8s_job_configs[run['workflow_type']]:
             self.logger.error("Error detected for a %s run of type %s. Run id: %s", run['physical_location'], run['workflow_type'], run['id'])
-            run['status_prov'] += f", error detected in a {run['physical_location']} run of type {run['workflow_type']}. No cleanup occurred."
+            run['status_prov'].append(f"error detected in a {run['physical_location']} run of type {run['workflow_type']}. No cleanup occurred.")
 
             # set error conditions
             run['job-type'] = JobType.COMPLETE
@@ -244,7 +398,8 @@ class JobSupervisor:
         # if this was a final staging run that failed force complete
         elif 'final-staging' in run:
             self.logger.error("Error detected for a %s run in final staging with run id: %s", run['physical_location'], run['id'])
-            run['status_prov'] += f", error detected for a {run['physical_location']} run in final staging. An incomplete cleanup may have occurred."
+            run['status_prov'].append(f"error detected for a {run['physical_location']} run in final staging. "
+                                      f"An incomplete cleanup may have occurred.")
 
             # set error conditions
             run['job-type'] = JobType.COMPLETE
@@ -252,16 +407,16 @@ class JobSupervisor:
         # else try to clean up
         else:
             self.logger.error(f"Error detected for a {run['physical_location']} run. About to clean up of intermediate files. Run id: %s", run['id'])
-            run['status_prov'] += ', error detected'
+            run['status_prov'].append('error detected')
 
             # set the type to clean up
             run['job-type'] = JobType.FINAL_STAGING
             run['status'] = JobStatus.NEW
 
         # report the issue
-        self.util_objs['pg_db'].update_job_status(run['id'], run['status_prov'])
+        self.update_run_status(run)
 
-    def handle_job_complete(self, run: dict):
+    async def handle_job_complete(self, run: dict):
         """
         handles the job state when it is marked complete
 
@@ -272,30 +427,66 @@ class JobSupervisor:
         duration = Utils.get_run_time_delta(run)
 
         # update the run provenance in the DB
-        run['status_prov'] += f', run complete {duration}'
-        self.util_objs['pg_db'].update_job_status(run['id'], run['status_prov'])
+        run['status_prov'].append(f'run complete {duration}')
+        status_prov: str = self.update_run_status(run)
 
         # init the type of run
         run_type = f"APS ({run['workflow_type']})"
 
         # add a comment on overall pass/fail
-        if run['status_prov'].find('error') == -1:
+        if not run['has-error']:
             msg = f"*{run['physical_location']} {run_type} run completed successfully {duration}*"
             emoticon = ':100:'
 
         else:
             msg = f"*{run['physical_location']} {run_type} run completed unsuccessfully {duration}*"
             emoticon = ':boom:'
-            self.util_objs['utils'].send_slack_msg(run['id'], f"{msg}\nRun provenance: {run['status_prov']}.", 'slack_issues_channel', run['debug'],
-                                                   run['instance_name'], emoticon)
+            self.utils.queue_slack_msg(run['id'], f"{msg}\nRun provenance: {status_prov}.",
+                                       'slack_issues_channel', debug_mode=run['debug'], instance_name=run['instance_name'], emoticon=emoticon)
         # send the message
-        self.util_objs['utils'].send_slack_msg(run['id'], msg, 'slack_status_channel', run['debug'], run['instance_name'], emoticon)
+        self.utils.queue_slack_msg(run['id'], msg, 'slack_status_channel', debug_mode=run['debug'], instance_name=run['instance_name'],
+                                   emoticon=emoticon)
 
         # send something to the log to indicate complete
         self.logger.info("%s complete.", run['id'])
 
         # remove the run
-        self.run_list.remove(run)
+        del self.run_list[run['id']]
+
+    def update_run_status(self, run: dict) -> str:
+        """
+        queues the run provenance to be written to the DB at the end of the pass. the provenance
+        is kept as a bounded list of events and only joined into a single string here.
+
+        :param run: the run parameters
+        :return: the provenance string that was queued
+        """
+        # build the provenance string from the list of events
+        status_prov: str = ', '.join(run['status_prov'])
+
+        # queue the run status. only the latest status for a run needs to be written
+        self.loop_state['pending_status_updates'][run['id']] = status_prov
+
+        # return the provenance to the caller
+        return status_prov
+
+    def flush_run_status(self):
+        """
+        writes all the queued run status updates to the DB in one round-trip
+
+        :return: nothing
+        """
+        # if there is anything to write
+        if self.loop_state['pending_status_updates']:
+            try:
+                # write the updates
+                self.pg_db.update_job_status_bulk(self.loop_state['pending_status_updates'])
+            except Exception:
+                # a failed status write should not stop the supervisor. the next status change for each run is written on a later pass
+                self.logger.exception('Error writing %s run status updates.', len(self.loop_state['pending_status_updates']))
+
+            # start a new set of updates
+            self.loop_state['pending_status_updates'] = {}
 
     def get_base_command_line(self, run: dict, job_type: JobType) -> (list, bool):
         """
@@ -315,88 +506,58 @@ class JobSupervisor:
         command_line_params = None
         extend_output_path = False
 
-        # get the proper job configs
-        job_configs = self.k8s_job_configs[run['workflow_type']]
+        # get the command line template for this job type
+        template = COMMAND_LINE_TEMPLATES.get(job_type)
+
+        # if this job type has command line parameters
+        if template is not None:
+            # get the proper job configs
+            job_configs = self.k8s_job_configs[run['workflow_type']]
 
-        # is this a staging job array
-        if job_type == JobType.STAGING:
-            command_line_params = ['--inputURL', run['downloadurl'], '--isHurricane', run['stormnumber'], '--outputDir']
-            extend_output_path = True
-
-        # is this a hazus job array
-        elif job_type == JobType.HAZUS:
-            command_line_params = ['--downloadurl', run['downloadurl'], '--datadir', job_configs[job_type]['DATA_MOUNT_PATH'] + '/' + str(run['id'])]
-
-        # is this an adcirc2cog_tiff job array
-        elif job_type == JobType.ADCIRC2COG_TIFF:
-            command_line_params = ['--inputDIR', job_configs[job_type]['DATA_MOUNT_PATH'] + '/' + str(run['id']) + '/input', '--outputDIR',
-                                   job_configs[job_type]['DATA_MOUNT_PATH'] + '/' + str(run['id']) + job_configs[job_type]['SUB_PATH'], '--inputFile']
-
-        # is this a geotiff2cog job array
-        elif job_type == JobType.GEOTIFF2COG:
-            command_line_params = ['--inputDIR', job_configs[job_type]['DATA_MOUNT_PATH'] + '/' + str(run['id']) + '/cogeo', '--finalDIR',
-                                   job_configs[job_type]['DATA_MOUNT_PATH'] + '/' + str(run['id']) + '/' + 'final' + job_configs[job_type][
-                                       'SUB_PATH'], '--inputParam']
-
-        # is this a geo server load job array
-        elif job_type == JobType.LOAD_GEO_SERVER:
-            command_line_params = ['--instanceId', str(run['id'])]
-
-        # is this a geo server load s3 job array
-        elif job_type == JobType.LOAD_GEO_SERVER_S3:
-            command_line_params = ['--instanceId', str(run['id']), '--HECRAS_URL', run['downloadurl']]
-
-        # is this a final staging job array
-        elif job_type == JobType.FINAL_STAGING:
-            command_line_params = ['--inputDir', job_configs[job_type]['DATA_MOUNT_PATH'] + '/' + str(run['id']) + job_configs[job_type]['SUB_PATH'],
-                                   '--outputDir', job_configs[job_type]['DATA_MOUNT_PATH'] + job_configs[job_type]['SUB_PATH'], '--tarMeta',
-                                   str(run['id'])]
-
-        # is this an obs mod ast job
-        elif job_type == JobType.OBS_MOD_AST:
-            thredds_url = run['downloadurl'] + '/fort.63.nc'
-            thredds_url = thredds_url.replace('fileServer', 'dodsC')
-
-            # create the additional command line parameters
-            command_line_params = [thredds_url, run['gridname'],
-                                   job_configs[job_type]['DATA_MOUNT_PATH'] + '/' + str(run['id']) + '/' + 'final' + job_configs[job_type][
-                                       'ADDITIONAL_PATH'], str(run['id'])]
-
-        # is this an ast run harvester job
-        elif job_type == JobType.AST_RUN_HARVESTER:
-            thredds_url = run['downloadurl'] + '/fort.63.nc'
-            thredds_url = thredds_url.replace('fileServer', 'dodsC')
-
-            # create the additional command line parameters
-            command_line_params = [thredds_url, job_configs[job_type]['DATA_MOUNT_PATH'] + job_configs[job_type]['SUB_PATH'], str(run['id'])]
-
-        # is this an adcirc time to cog converter job array
-        elif job_type == JobType.ADCIRCTIME_TO_COG:
-            command_line_params = ['--inputDIR', job_configs[job_type]['DATA_MOUNT_PATH'] + '/' + str(run['id']) + '/input', '--outputDIR',
-                                   job_configs[job_type]['DATA_MOUNT_PATH'] + '/' + str(run['id']) + job_configs[job_type]['SUB_PATH'], '--finalDIR',
-                                   job_configs[job_type]['DATA_MOUNT_PATH'] + '/' + str(run['id']) + '/' + 'final' + job_configs[job_type][
-                                       'SUB_PATH'], '--inputFile']
-
-        # is this a collaborator data sync job
-        elif job_type == JobType.COLLAB_DATA_SYNC:
-            command_line_params = ['--run_id', str(run['id']), '--physical_location', str(run['physical_location'])]
-
-        # is this an adcirc to kalpana cog job
-        elif job_type == JobType.ADCIRC_TO_KALPANA_COG:
-            command_line_params = ['--modelRunID', str(run['id'])]
-
-        # is this a timeseries DB ingest job
-        elif job_type == JobType.TIMESERIESDB_INGEST:
-            command_line_params = ['--modelRunID', str(run['id'])]
+            # how to get each value that can go into the command line templates. these are only called for the values
+            # a template uses, so a job type only needs the run and job config fields it formats
+            value_getters: dict = {'run_id': lambda: run['id'], 'run_path': lambda: f"{job_configs[job_type]['DATA_MOUNT_PATH']}/{run['id']}",
+                                   'mount_path': lambda: job_configs[job_type]['DATA_MOUNT_PATH'],
+                                   'sub_path': lambda: job_configs[job_type]['SUB_PATH'],
+                                   'additional_path': lambda: job_configs[job_type]['ADDITIONAL_PATH'],
+                                   'downloadurl': lambda: run['downloadurl'], 'stormnumber': lambda: run['stormnumber'],
+                                   'gridname': lambda: run['gridname'], 'physical_location': lambda: run['physical_location'],
+                                   'thredds_url': lambda: f"{run['downloadurl'].replace('fileServer', 'dodsC')}/fort.63.nc"}
+
+            # get the values this template uses
+            values: dict = {field: value_getters[field]() for field in COMMAND_LINE_FIELDS[job_type]}
+
+            # fill in the command line
+            command_line_params = [param.format_map(values) for param in template[0]]
+            extend_output_path = template[1]
 
         # return the command line and extend the path flag
         return command_line_params, extend_output_path
 
-    def handle_run(self, run: dict) -> bool:
+    async def delete_run_job(self, run: dict) -> bool:
+        """
+        removes the k8s job of the run and logs a failed delete
+
+        :param run: the run parameters
+        :return: a flag indicating the job was removed
+        """
+        # remove the job. the k8s client call blocks so it is done in a worker thread
+        job_deleted, job_del_status = await asyncio.to_thread(self.k8s_create.delete_job, run)
+
+        # if the job could not be removed
+        if not job_deleted:
+            self.logger.error("Error: A %s job was not deleted. Run ID: %s, Job type: %s, job delete status: %s", run['physical_location'], run['id'],
+                              run['job-type'], job_del_status)
+
+        # return to the caller
+        return job_deleted
+
+    async def handle_run(self, run: dict, job_info: dict) -> bool:
         """
         handles the run processing
 
         :param run: the run parameters
+        :param job_info: the k8s job information for this pass. None if it could not be gathered
         :return: boolean run activity indicator
         """
         # init the activity flag
@@ -417,7 +578,13 @@ class JobSupervisor:
             if 'PARALLEL' in job_configs[run['job-type']] and job_configs[run['job-type']]['PARALLEL']:
                 job_type_list.extend(job_configs[run['job-type']]['PARALLEL'])
 
-            # create jobs from items in the list
+            # if the next job is complete there is no reason to add more jobs after it
+            for index, job_type in enumerate(job_type_list):
+                if job_configs[job_type.value]['NEXT_JOB_TYPE'] == JobType.COMPLETE.value:
+                    del job_type_list[index + 1:]
+                    break
+
+            # create a new run configuration for each step
             for job_type in job_type_list:
                 # get the data by the download url
                 command_line_params, extend_output_path = self.get_base_command_line(run, job_type)
@@ -425,99 +592,116 @@ class JobSupervisor:
                 # create a new run configuration for the step
                 self.k8s_create_run_config(run, job_type, command_line_params, extend_output_path)
 
-                # execute the k8s job run
-                job_id = self.util_objs['create'].execute(run, job_type)
+            # execute the k8s job runs at the same time
+            job_ids: list = await asyncio.gather(*(asyncio.to_thread(self.k8s_create.execute, run, job_type) for job_type in job_type_list))
 
-                # did we not get a job_id
+            # check the results of each job
+            for job_type, job_id in zip(job_type_list, job_ids):
+                # did we get a job_id
                 if job_id is not None:
-                    # set the current status
-                    run['status'] = JobStatus.RUNNING
-                    run['status_prov'] += f", {job_type.value} running"
-                    self.util_objs['pg_db'].update_job_status(run['id'], run['status_prov'])
+                    run['status_prov'].append(f"{job_type.value} running")
 
                     self.logger.info("A %s job was created. Run ID: %s, Job type: %s", run['physical_location'], run['id'], job_type)
                 else:
-                    # set the error status
-                    run['status'] = JobStatus.ERROR
-
                     self.logger.info("A %s job was not created. Run ID: %s, Job type: %s", run['physical_location'], run['id'], job_type)
 
-                # if the next job is complete there is no reason to keep adding more jobs
-                if job_configs[job_type.value]['NEXT_JOB_TYPE'] == JobType.COMPLETE.value:
-                    break
+            # set the current status. the run is in error if any job was not created
+            run['status'] = JobStatus.ERROR if None in job_ids else JobStatus.RUNNING
+            self.update_run_status(run)
 
-        # if the job is running check the status
-        if run['status'] == JobStatus.RUNNING and run['status'] != JobStatus.ERROR:
+            # save when the jobs were submitted so they are not declared missing before k8s lists them
+            run['job-submitted'] = time.monotonic()
+
+        # if the job is running check the status. jobs created above are checked
+        # on the next pass, once the k8s job information has been refreshed.
+        elif run['status'] == JobStatus.RUNNING and job_info is not None:
             # set the activity flag
             no_activity = False
 
             # find the job, get the status
-            job_found, job_status, pod_status = self.util_objs['k8s_find'].find_job_info(run)
-
-            # check the job status, report any issues
-            if not job_found:
-                self.logger.error("Error: A %s job not found. Run ID: %s, Job type: %s", run['physical_location'], run['id'], run['job-type'])
-            elif job_status.startswith('Timeout'):
-                self.logger.error("Error: A %s job has timed out. Run ID: %s, Job type: %s", run['physical_location'], run['id'], run['job-type'])
-            elif job_status.startswith('Failed'):
-                self.logger.error("Error: A %s job has failed. Run ID: %s, Job type: %s", run['physical_location'], run['id'], run['job-type'])
-                run['status_prov'] += f", {run['job-type'].value} failed"
-            elif job_status.startswith('Complete'):
-                self.logger.info("A %s job has completed. Run ID: %s, Job type: %s", run['physical_location'], run['id'], run['job-type'])
+            job_found, job_status, pod_status = self.k8s_find.find_job_info(run, job_info)
 
             # if the job was found
             if job_found:
-                # did the job timeout (presumably waiting for resources) or failed
-                if job_status.startswith('Timeout') or job_status.startswith('Failed'):
-                    # remove the job and get the final run status
-                    job_del_status = self.util_objs['create'].delete_job(run)
-
-                    # set error conditions
-                    run['status'] = JobStatus.ERROR
-                # did the job and pod succeed
-                elif job_status.startswith('Complete') and not pod_status.startswith('Failed'):
-                    # remove the job and get the final run status
-                    job_del_status = self.util_objs['create'].delete_job(run)
-
-                    # was there an error on the job
-                    if job_del_status == '{}' or job_del_status.find('Failed') != -1:
-                        self.logger.error("Error: A failed %s job detected. Run status %s. Run ID: %s, Job type: %s, job delete status: %s, "
-                                          "pod status: %s", run['physical_location'], run['status'], run['id'], run['job-type'], job_del_status,
-                                          pod_status)
+                # the job is visible in k8s, so it is no longer in the submission grace period
+                run.pop('job-submitted', None)
+
+                # classify the job and pod status once
+                job_state = next((state for state in ('Timeout', 'Failed', 'Complete') if job_status.startswith(state)), None)
+                pod_failed: bool = pod_status.startswith('Failed')
+
+                # work the job state
+                match job_state, pod_failed:
+                    # did the job timeout (presumably waiting for resources)
+                    case 'Timeout', _:
+                        self.logger.error("Error: A %s job has timed out. Run ID: %s, Job type: %s", run['physical_location'], run['id'],
+                                          run['job-type'])
+
+                        # remove the job
+                        await self.delete_run_job(run)
 
                         # set error conditions
                         run['status'] = JobStatus.ERROR
-                    else:
-                        # complete this job and setup for the next job
-                        run['status_prov'] += f", {run['job-type'].value} complete"
-                        self.util_objs['pg_db'].update_job_status(run['id'], run['status_prov'])
-
-                        # prepare for next stage
-                        run['job-type'] = JobType(run[run['job-type'].value]['run-config']['NEXT_JOB_TYPE'])
-
-                        # if the job type is not in the run then declare it new
-                        if run['job-type'] not in run:
-                            # set the job to new
-                            run['status'] = JobStatus.NEW
-
-                            # note this bit is for troubleshooting when the steps have been set
-                            # into a loop back to staging. if so, remove all other job types that may have done
-                            # also add this to the above if statement -> or run['job-type'] == JobType.STAGING
-                            # and uncomment below...
-                            # for i in run.copy(): if isinstance(i, JobType) and i is not JobType.STAGING: run.pop(i)
-
-                # was there a failure. remove the job and declare failure
-                elif pod_status.startswith('Failed'):
-                    # remove the job and get the final run status
-                    job_del_status = self.util_objs['create'].delete_job(run)
-
-                    if job_del_status == '{}' or job_del_status.find('Failed') != -1:
-                        self.logger.error("Error: A failed %s job and/or pod detected. Run status: %s. Run ID: %s, Job type: %s, job delete status: "
-                                          "%s, pod status: %s.", run['physical_location'], run['status'], run['id'], run['job-type'], job_del_status,
+
+                    # did the job fail
+                    case 'Failed', _:
+                        self.logger.error("Error: A %s job has failed. Run ID: %s, Job type: %s", run['physical_location'], run['id'],
+                                          run['job-type'])
+                        run['status_prov'].append(f"{run['job-type'].value} failed")
+
+                        # remove the job
+                        await self.delete_run_job(run)
+
+                        # set error conditions
+                        run['status'] = JobStatus.ERROR
+
+                    # did the job and pod succeed
+                    case 'Complete', False:
+                        self.logger.info("A %s job has completed. Run ID: %s, Job type: %s", run['physical_location'], run['id'], run['job-type'])
+
+                        # remove the job. a failed job or pod was already caught by the find status above
+                        job_deleted: bool = await self.delete_run_job(run)
+
+                        # if the job could not be removed
+                        if not job_deleted:
+                            # set error conditions
+                            run['status'] = JobStatus.ERROR
+                        else:
+                            # complete this job and setup for the next job
+                            run['status_prov'].append(f"{run['job-type'].value} complete")
+                            self.update_run_status(run)
+
+                            # prepare for next stage
+                            run['job-type'] = JOB_TYPE_VALUES[run[run['job-type'].value]['run-config']['NEXT_JOB_TYPE']]
+
+                            # if the job type is not in the run then declare it new
+                            if run['job-type'] not in run:
+                                # set the job to new
+                                run['status'] = JobStatus.NEW
+
+                                # note this bit is for troubleshooting when the steps have been set
+                                # into a loop back to staging. if so, remove all other job types that may have done
+                                # also add this to the above if statement -> or run['job-type'] == JobType.STAGING
+                                # and uncomment below...
+                                # for i in (set(JobType) - {JobType.STAGING}) & run.keys(): run.pop(i)
+
+                    # was there a failure. remove the job and declare failure
+                    case _, True:
+                        self.logger.error("Error: A failed %s pod detected. Run status: %s. Run ID: %s, Job type: %s, job status: %s, "
+                                          "pod status: %s.", run['physical_location'], run['status'], run['id'], run['job-type'], job_status,
                                           pod_status)
 
-                    # set error conditions
-                    run['status'] = JobStatus.ERROR
+                        # remove the job
+                        await self.delete_run_job(run)
+
+                        # set error conditions
+                        run['status'] = JobStatus.ERROR
+            # the job may have just been created and is not listed by k8s yet
+            elif run.get('job-submitted') is not None and time.monotonic() - run['job-submitted'] < self.k8s_base_config.get('JOB_FIND_GRACE', 30):
+                self.logger.debug("A %s job was not found yet. Run ID: %s, Job type: %s", run['physical_location'], run['id'], run['job-type'])
+
+                # nothing happened for this run
+                no_activity = True
             else:
                 self.logger.error("Error: A %s job not found: Run ID: %s, Run status: %s, Job type: %s", run['physical_location'], run['id'],
                                   run['status'], run['job-type'])
@@ -543,8 +727,8 @@ class JobSupervisor:
 
         :return: nothing
         """
-        # get the job type config
-        config = self.get_job_configs()[run['workflow_type']][job_type]
+        # get a copy of the job type config from the configs loaded for this pass
+        config = deepcopy(self.k8s_job_configs[run['workflow_type']][job_type])
 
         # load the config with the info from the config file
         config['JOB_NAME'] += str(run['id']).lower().replace('_', '-')
@@ -568,46 +752,39 @@ class JobSupervisor:
         :param run_info:
         :return: list of required items that weren't found
         """
-        # if there was an instance name use it
-        if 'instancename' in run_info:
-            instance_name = run_info['instancename']
-        else:
-            instance_name = None
+        # get the instance name if there is one
+        instance_name = run_info.get('instancename')
 
         # if there is a special k8s download url in the data use it.
-        if 'post.opendap.renci_tds-k8.downloadurl' in run_info:
+        k8s_download_url = run_info.get('post.opendap.renci_tds-k8.downloadurl')
+
+        if k8s_download_url is not None:
             # use the service name and save it for the run. force the apsviz thredds url -> https:
-            run_info['downloadurl'] = run_info['post.opendap.renci_tds-k8.downloadurl'].replace('http://apsviz-thredds', 'https://apsviz-thredds')
+            run_info['downloadurl'] = k8s_download_url.replace('http://apsviz-thredds', 'https://apsviz-thredds')
 
         # interrogate and set debug mode
-        debug_mode = ('supervisor_job_status' in run_info and run_info['supervisor_job_status'].startswith('debug'))
+        debug_mode = run_info.get('supervisor_job_status', '').startswith('debug')
 
-        # get the workflow type
-        if 'workflow_type' in run_info:
-            workflow_type = run_info['workflow_type']
-        # if there is no workflow type default to APSVIZ legacy runs
-        else:
-            workflow_type = 'ECFLOW'
+        # get the workflow type. if there is no workflow type default to APSVIZ legacy runs
+        workflow_type = run_info.get('workflow_type', 'ECFLOW')
 
         # get the physical location of the cluster that initiated the run
-        if 'physical_location' in run_info:
-            physical_location = run_info['physical_location']
-        else:
-            physical_location = ''
+        physical_location = run_info.get('physical_location', '')
 
         # get the relay context if this came from another run
-        if 'relay_context' in run_info:
-            relay_context = ', relayed from ' + run_info['relay_context']
-        else:
-            relay_context = ''
+        relay_context = f", relayed from {run_info['relay_context']}" if 'relay_context' in run_info else ''
 
         # if the storm number doesn't exist default it
-        if 'stormnumber' not in run_info:
-            run_info['stormnumber'] = 'NA'
+        run_info.setdefault('stormnumber', 'NA')
+
+        # get the params that are missing
+        missing_params = REQUIRED_RUN_PARAMS.keys() - run_info.keys()
 
-        # loop through the params and return the ones that are missing
-        return (f"{', '.join([run_param for run_param in self.required_run_params if run_param not in run_info])}", instance_name, debug_mode,
-                workflow_type, physical_location, relay_context)
+        # put the missing params in the order they are required. nothing is usually missing
+        missing_params_msg: str = ', '.join([param for param in REQUIRED_RUN_PARAMS if param in missing_params]) if missing_params else ''
+
+        # return the missing params and run info to the caller
+        return missing_params_msg, instance_name, debug_mode, workflow_type, physical_location, relay_context
 
     def check_for_duplicate_run(self, new_run_id: str) -> bool:
         """
@@ -616,21 +793,10 @@ class JobSupervisor:
         :param new_run_id:
         :return:
         """
+        # return to the caller if the run is already in the list
+        return new_run_id in self.run_list
 
-        # init found flag, presume not found
-        ret_val: bool = False
-
-        # loop through the current run list
-        for item in self.run_list:
-            # was it found
-            if item['id'] == new_run_id:
-                # set the flag
-                ret_val = True
-
-        # return to the caller
-        return ret_val
-
-    def get_incomplete_runs(self):
+    async def get_incomplete_runs(self):
         """
         get the list of instances that need processing
 
@@ -643,12 +809,12 @@ class JobSupervisor:
         debug_mode: bool = False
 
         # get the latest job definitions
-        self.k8s_job_configs = self.get_job_configs()
+        self.k8s_job_configs = await asyncio.to_thread(self.get_job_configs)
 
         # make sure we got the config to continue
         if self.k8s_job_configs is not None:
             # check to see if we are in pause mode
-            runs = self.check_pause_status()
+            runs = await self.check_pause_status()
 
             # did we find anything to do
             if runs is not None:
@@ -657,75 +823,83 @@ class JobSupervisor:
                     # save the run id that was provided by the DB run.properties data
                     run_id = run['run_id']
 
+                    # get a local reference to the run properties as they are used throughout
+                    run_data: dict = run['run_data']
+
                     # check for a duplicate run
                     if not self.check_for_duplicate_run(run_id):
                         # make sure all the needed params are available. instance name and debug mode
                         # are handled here because they both affect messaging and logging.
                         missing_params_msg, instance_name, debug_mode, workflow_type, physical_location, relay_context = self.check_input_params(
-                            run['run_data'])
+                            run_data)
 
                         # check the run params to see if there is something missing
                         if len(missing_params_msg) > 0:
-                            # update the run status everywhere
-                            self.util_objs['pg_db'].update_job_status(run_id, f"Error - Run lacks the required run properties "
-                                                                              f"({missing_params_msg}).")
+                            # update the run status everywhere. the DB status is written with the other status updates for this pass
+                            self.loop_state['pending_status_updates'][run_id] = (f"Error - Run lacks the required run properties "
+                                                                                 f"({missing_params_msg}).")
                             self.logger.error("Error: A %s run lacks the required run properties (%s): %s", physical_location, missing_params_msg,
                                               run_id)
-                            self.util_objs['utils'].send_slack_msg(run_id, f"Error - Run lacks the required run properties ({missing_params_msg}) "
-                                                                           f"for a {physical_location} run.", 'slack_issues_channel', debug_mode,
-                                                                   instance_name)
+                            self.utils.queue_slack_msg(run_id, f"Error - Run lacks the required run properties ({missing_params_msg}) "
+                                                               f"for a {physical_location} run.", 'slack_issues_channel',
+                                                       debug_mode=debug_mode, instance_name=instance_name)
 
                             # continue processing the remaining runs
                             continue
 
+                        # get the requested run command
+                        run_command: str = run_data['supervisor_job_status']
+
                         # if this is a new run
-                        if run['run_data']['supervisor_job_status'].startswith('new'):
+                        if run_command.startswith('new'):
                             job_prov = f'New {physical_location} APS ({workflow_type})'
                         # if we are in debug mode
-                        elif run['run_data']['supervisor_job_status'].startswith('debug'):
+                        elif run_command.startswith('debug'):
                             job_prov = f'New debug {physical_location} APS ({workflow_type})'
                         # ignore the entry as it is not in a legit "start" state. this may just
                         # be an existing or completed run.
                         else:
                             self.logger.info("Error: Unrecognized %s run command %s for Run ID %s", physical_location,
-                                             run['run_data']['supervisor_job_status'], run_id)
+                                             run_command, run_id)
                             continue
 
                         # get the first job for this workflow type
-                        first_job = self.util_objs['pg_db'].get_first_job(workflow_type)
+                        first_job = await asyncio.to_thread(self.pg_db.get_first_job, workflow_type)
+
+                        # get the first job name into a type. this is None if no job was found or the name is not a known job type
+                        job_type = JOB_TYPE_VALUES.get(first_job)
 
                         # did we get a job type
-                        if first_job is not None:
-                            # get the first job name into a type
-                            job_type = JobType(first_job)
-                        else:
+                        if job_type is None:
                             self.logger.info("Error: Could not find the first %s job in the %s workflow for run id: %s", physical_location,
                                              workflow_type, run_id)
                             continue
 
                         # add the new run to the list
-                        self.run_list.append(
-                            {'id': run_id, 'workflow_type': workflow_type, 'stormnumber': run['run_data']['stormnumber'], 'debug': debug_mode,
-                             'fake-jobs': self.debug_options['fake_job'], 'job-type': job_type, 'status': JobStatus.NEW,
-                             'status_prov': f'{job_prov} run accepted', 'downloadurl': run['run_data']['downloadurl'],
-                             'gridname': run['run_data']['adcirc.gridname'], 'instance_name': run['run_data']['instancename'],
-                             'run-start': dt.datetime.now(), 'physical_location': physical_location})
+                        self.run_list[run_id] = {'id': run_id, 'workflow_type': workflow_type, 'stormnumber': run_data['stormnumber'],
+                                                 'debug': debug_mode, 'fake-jobs': self.debug_options['fake_job'], 'job-type': job_type,
+                                                 'status': JobStatus.NEW, 'has-error': False,
+                                                 'status_prov': deque([f'{job_prov} run accepted{relay_context}'],
+                                                                      maxlen=self.k8s_base_config.get('STATUS_PROV_MAX', 64)),
+                                                 'downloadurl': run_data['downloadurl'], 'gridname': run_data['adcirc.gridname'],
+                                                 'instance_name': instance_name, 'run-start': time.monotonic(),
+                                                 'physical_location': physical_location}
 
                         # update the run status in the DB
-                        self.util_objs['pg_db'].update_job_status(run_id, f'{job_prov} run accepted{relay_context}')
+                        self.update_run_status(self.run_list[run_id])
 
                         # notify Slack
-                        self.util_objs['utils'].send_slack_msg(run_id, f'{job_prov} run accepted{relay_context}.', 'slack_status_channel', debug_mode,
-                                                               run['run_data']['instancename'], ':rocket:')
+                        self.utils.queue_slack_msg(run_id, f'{job_prov} run accepted{relay_context}.',
+                                                   'slack_status_channel', debug_mode=debug_mode, instance_name=instance_name, emoticon=':rocket:')
                     else:
                         # update the run status in the DB
-                        self.util_objs['pg_db'].update_job_status(run_id, 'Duplicate run rejected.')
+                        self.loop_state['pending_status_updates'][run_id] = 'Duplicate run rejected.'
 
                         # notify Slack
-                        self.util_objs['utils'].send_slack_msg(run_id, 'Duplicate run rejected.', 'slack_status_channel', debug_mode,
-                                                               run['run_data']['instancename'], ':boom:')
+                        self.utils.queue_slack_msg(run_id, 'Duplicate run rejected.', 'slack_status_channel', debug_mode=debug_mode,
+                                                   instance_name=run_data['instancename'], emoticon=':boom:')
 
-    def check_pause_status(self) -> dict:
+    async def check_pause_status(self) -> dict:
         """
         checks to see if we are in pause mode. if the system isn't, get new runs.
 
@@ -735,7 +909,7 @@ class JobSupervisor:
         runs = None
 
         # get the flag that indicates we are pausing the handling of new run requests
-        pause_mode = os.path.exists(os.path.join(os.path.dirname(__file__), '../', '../', str('pause')))
+        pause_mode = os.path.exists(PAUSE_PATH)
 
         # are we toggling pause mode
         if pause_mode != self.debug_options['pause_mode']:
@@ -743,12 +917,22 @@ class JobSupervisor:
             self.debug_options['pause_mode'] = pause_mode
 
             # let everyone know pause mode was toggled
-            self.util_objs['utils'].send_slack_msg(None, f'Application is now {"paused" if pause_mode else "active"}.', 'slack_status_channel')
+            self.utils.queue_slack_msg(None, f'Application is now {"paused" if pause_mode else "active"}.', 'slack_status_channel')
+
+        # get a reference to the new run notification state
+        new_runs: dict = self.loop_state['new_runs']
+
+        # when notifications are used, only look for new runs if one was announced or periodically in case a notification was missed
+        check_for_runs: bool = (not new_runs['channel'] or new_runs['notified'] or
+                                time.monotonic() - new_runs['last_check'] >= self.k8s_base_config.get('NEW_RUN_RECONCILE_SLEEP', 300))
 
         # get all the new runs if system is not in pause mode
-        if not pause_mode:
+        if not pause_mode and check_for_runs:
+            # reset the new run check state
+            new_runs.update({'notified': False, 'last_check': time.monotonic()})
+
             # get the new runs
-            runs = self.util_objs['pg_db'].get_new_runs()
+            runs = await asyncio.to_thread(self.pg_db.get_new_runs)
 
         # return to the caller
         return runs
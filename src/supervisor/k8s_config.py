@@ -0,0 +1,50 @@
+# SPDX-FileCopyrightText: 2022 Renaissance Computing Institute. All rights reserved.
+# SPDX-FileCopyrightText: 2023 Renaissance Computing Institute. All rights reserved.
+# SPDX-FileCopyrightText: 2024 Renaissance Computing Institute. All rights reserved.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-License-Identifier: LicenseRef-RENCI
+# SPDX-License-Identifier: MIT
+
+"""
+    Loads the k8s configuration used by the k8s API clients
+
+    Author: Phil Owen, RENCI.org
+"""
+
+import threading
+from kubernetes import config
+
+
+class K8sConfig:
+    """
+    Class that loads the k8s configuration once per process
+    """
+
+    # the k8s configuration only needs to be loaded once per process. the lock keeps threads from loading it at the same time
+    k8s_config_state: dict = {'loaded': False, 'lock': threading.Lock()}
+
+    @staticmethod
+    def load_k8s_config(cluster: str):
+        """
+        loads the k8s configuration for the k8s API clients. this is only done on the first call
+
+        :param cluster: the cluster context to use if this is not running on the cluster
+        :return: nothing
+        """
+        # only let one thread load the config
+        with K8sConfig.k8s_config_state['lock']:
+            # if the config has not been loaded yet
+            if not K8sConfig.k8s_config_state['loaded']:
+                try:
+                    # first try to get the config if this is running on the cluster
+                    config.load_incluster_config()
+                except config.ConfigException:
+                    try:
+                        # else get the local config. this local config must match the cluster name in your k8s config
+                        config.load_kube_config(context=cluster)
+                    except config.ConfigException as exc:
+                        raise Exception("Could not configure kubernetes python client") from exc
+
+                # the config is now loaded
+                K8sConfig.k8s_config_state['loaded'] = True
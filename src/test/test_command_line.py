@@ -11,8 +11,11 @@
 
     Author: Phil Owen, RENCI.org
 """
+from itertools import chain
+from unittest.mock import patch
 from src.supervisor.job_supervisor import JobSupervisor
-from src.common.job_enums import JobType
+from src.common.job_enums import JobType, JOB_TYPE_VALUES
+from src.common.utils import Utils
 
 
 def test_command_line():
@@ -30,26 +33,92 @@ def test_command_line():
     # for each workflow type
     for workflow_type, workflow_steps in sv_cmds.k8s_job_configs.items():
         # for each workflow job step
-        for job_step in workflow_steps:
+        for job_step, step_config in workflow_steps.items():
             # create a dummy run command from the step definition
             run = {'id': '<RUN ID>', 'workflow_type': workflow_type, 'job-type': job_step,
                    'downloadurl': '<TDS URL>', 'physical_location': '<SITE NAME>', 'gridname': '<GRID NAME>',
                    'stormnumber': '<STORM_NUMBER>'}
 
             # convert the job step name into a job type enum
-            job_type = JobType(job_step)
+            job_type = JOB_TYPE_VALUES[job_step]
 
             # get the base command
             base_cmd = sv_cmds.get_base_command_line(run, job_type)
 
-            # create the full commend line
-            new_cmd_list: list = workflow_steps[job_step]['COMMAND_LINE'].copy()
-
-            # add the command matrix value
-            new_cmd_list.extend(base_cmd[0])
+            # create the full command line with the command matrix value, dropping any empty elements
+            new_cmd_list: list = [arg for arg in chain(step_config['COMMAND_LINE'], base_cmd[0]) if arg != '']
 
             # make sure the commands were returned
             assert len(new_cmd_list) > 0
 
             # output for the user
             print(f'\njob_type: {job_type}\nDB cmd: {new_cmd_list}\nfinal command line: {" ".join([str(x) for x in new_cmd_list])}')
+
+
+def test_command_line_templates():
+    """
+    tests that the command line templates produce the same command lines as the original per job type code.
+    the DB and the base config are not needed for this so they are swapped out.
+
+    :return:
+    """
+    # create the supervisor without a DB connection or a deployed base config
+    with patch('src.supervisor.job_supervisor.PGImplementation'), patch.object(Utils, 'get_base_config', return_value={'JOB_LIMIT_MULTIPLIER': '1'}):
+        sv_cmds = JobSupervisor()
+
+    # use the same dummy job config for every job type
+    sv_cmds.k8s_job_configs = {'ECFLOW': dict.fromkeys(JobType, {'DATA_MOUNT_PATH': '/data', 'SUB_PATH': '/sub', 'ADDITIONAL_PATH': '/add'})}
+
+    # create a dummy run
+    run = {'id': 'run-1', 'workflow_type': 'ECFLOW', 'downloadurl': 'https://host/thredds/fileServer/run', 'stormnumber': 'al01',
+           'gridname': 'grid', 'physical_location': 'SITE'}
+
+    # the command lines the original code created for the dummy run
+    expected: dict = {
+        JobType.STAGING: (['--inputURL', 'https://host/thredds/fileServer/run', '--isHurricane', 'al01', '--outputDir'], True),
+        JobType.HAZUS: (['--downloadurl', 'https://host/thredds/fileServer/run', '--datadir', '/data/run-1'], False),
+        JobType.LOAD_GEO_SERVER: (['--instanceId', 'run-1'], False),
+        JobType.LOAD_GEO_SERVER_S3: (['--instanceId', 'run-1', '--HECRAS_URL', 'https://host/thredds/fileServer/run'], False),
+        JobType.FINAL_STAGING: (['--inputDir', '/data/run-1/sub', '--outputDir', '/data/sub', '--tarMeta', 'run-1'], False),
+        JobType.ADCIRC2COG_TIFF: (['--inputDIR', '/data/run-1/input', '--outputDIR', '/data/run-1/sub', '--inputFile'], False),
+        JobType.GEOTIFF2COG: (['--inputDIR', '/data/run-1/cogeo', '--finalDIR', '/data/run-1/final/sub', '--inputParam'], False),
+        JobType.OBS_MOD_AST: (['https://host/thredds/dodsC/run/fort.63.nc', 'grid', '/data/run-1/final/add', 'run-1'], False),
+        JobType.ADCIRCTIME_TO_COG: (['--inputDIR', '/data/run-1/input', '--outputDIR', '/data/run-1/sub', '--finalDIR', '/data/run-1/final/sub',
+                                     '--inputFile'], False),
+        JobType.AST_RUN_HARVESTER: (['https://host/thredds/dodsC/run/fort.63.nc', '/data/sub', 'run-1'], False),
+        JobType.COLLAB_DATA_SYNC: (['--run_id', 'run-1', '--physical_location', 'SITE'], False),
+        JobType.ADCIRC_TO_KALPANA_COG: (['--modelRunID', 'run-1'], False),
+        JobType.TIMESERIESDB_INGEST: (['--modelRunID', 'run-1'], False),
+        JobType.ERROR: (None, False),
+        JobType.OTHER_1: (None, False),
+        JobType.COMPLETE: (None, False)}
+
+    # make sure every job type is covered
+    assert set(expected) == set(JobType)
+
+    # for each job type
+    for job_type, command_line in expected.items():
+        # make sure the command line has not changed
+        assert sv_cmds.get_base_command_line(run, job_type) == command_line, job_type
+
+
+def test_command_line_template_fields():
+    """
+    tests that a job type only needs the run and job config fields its command line uses.
+
+    :return:
+    """
+    # create the supervisor without a DB connection or a deployed base config
+    with patch('src.supervisor.job_supervisor.PGImplementation'), patch.object(Utils, 'get_base_config', return_value={'JOB_LIMIT_MULTIPLIER': '1'}):
+        sv_cmds = JobSupervisor()
+
+    # use job configs that only have the data mount path
+    sv_cmds.k8s_job_configs = {'ECFLOW': dict.fromkeys(JobType, {'DATA_MOUNT_PATH': '/data'})}
+
+    # create a dummy run without a storm number, grid name or location
+    run = {'id': 'run-1', 'workflow_type': 'ECFLOW', 'downloadurl': 'https://host/thredds/fileServer/run'}
+
+    # these job types do not use the sub path, additional path or the missing run fields
+    assert sv_cmds.get_base_command_line(run, JobType.HAZUS) == (['--downloadurl', 'https://host/thredds/fileServer/run', '--datadir',
+                                                                   '/data/run-1'], False)
+    assert sv_cmds.get_base_command_line(run, JobType.LOAD_GEO_SERVER) == (['--instanceId', 'run-1'], False)
@@ -0,0 +1,36 @@
+# SPDX-FileCopyrightText: 2022 Renaissance Computing Institute. All rights reserved.
+# SPDX-FileCopyrightText: 2023 Renaissance Computing Institute. All rights reserved.
+# SPDX-FileCopyrightText: 2024 Renaissance Computing Institute. All rights reserved.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-License-Identifier: LicenseRef-RENCI
+# SPDX-License-Identifier: MIT
+
+"""
+    Job create tests.
+
+    Author: Phil Owen, RENCI.org
+"""
+from unittest.mock import patch
+from src.supervisor.job_create import JobCreate
+from src.common.utils import Utils
+
+
+def test_get_resource_limit():
+    """
+    tests that the resource limits keep the units of the requested quantity.
+
+    :return:
+    """
+    # create the object with a 50% limit multiplier without a deployed base config
+    with patch.object(Utils, 'get_base_config', return_value={'JOB_LIMIT_MULTIPLIER': '0.5'}):
+        job_create = JobCreate()
+
+    # make sure millicores, binary units and bare numbers get the limit in the same units
+    assert job_create.get_resource_limit('500m') == '750m'
+    assert job_create.get_resource_limit('2Gi') == '3Gi'
+    assert job_create.get_resource_limit('512Mi') == '768Mi'
+    assert job_create.get_resource_limit('4') == '6'
+
+    # make sure the fraction is dropped like it was before
+    assert job_create.get_resource_limit('3') == '4'
@@ -0,0 +1,127 @@
+# SPDX-FileCopyrightText: 2022 Renaissance Computing Institute. All rights reserved.
+# SPDX-FileCopyrightText: 2023 Renaissance Computing Institute. All rights reserved.
+# SPDX-FileCopyrightText: 2024 Renaissance Computing Institute. All rights reserved.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-License-Identifier: LicenseRef-RENCI
+# SPDX-License-Identifier: MIT
+
+"""
+    Job find tests.
+
+    Author: Phil Owen, RENCI.org
+"""
+from unittest.mock import create_autospec
+from kubernetes import client
+from src.supervisor.job_find import JobFind
+
+
+def make_job(job_name: str, **status) -> client.V1Job:
+    """
+    creates a k8s job with the supervisor labels
+
+    :param job_name: the name of the job
+    :param status: the k8s job status counts
+    :return: the k8s job
+    """
+    # return the job
+    return client.V1Job(metadata=client.V1ObjectMeta(name=job_name, labels={'job-name': job_name, 'apsviz-supervisor': 'true'}),
+                        status=client.V1JobStatus(**status))
+
+
+def get_job_find() -> JobFind:
+    """
+    creates a JobFind with a mocked k8s API hook so no k8s configuration or cluster is needed
+
+    :return: the JobFind object
+    """
+    # create the object
+    job_find = JobFind()
+
+    # swap in a mocked API hook
+    job_find.api_instance = create_autospec(client.BatchV1Api, instance=True)
+
+    # return the object
+    return job_find
+
+
+def read_job(name: str, namespace: str) -> client.V1Job:
+    """
+    stands in for reading a job by name. only the hazus-1 job exists.
+
+    :param name: the name of the job
+    :param namespace: the k8s namespace
+    :return: the k8s job
+    """
+    # jobs other than hazus-1 do not exist
+    if name != 'hazus-1':
+        raise client.ApiException(status=404, reason=f'{name} not found in {namespace}')
+
+    # return the completed job
+    return make_job(name, succeeded=1)
+
+
+def test_find_all_job_info_labelled():
+    """
+    tests that the job states come from the one labelled job list.
+
+    :return:
+    """
+    # get the object with the mocked API
+    job_find = get_job_find()
+
+    # return the labelled jobs in each state
+    job_find.api_instance.list_namespaced_job.return_value = client.V1JobList(
+        items=[make_job('staging-1', active=1), make_job('hazus-1', failed=1), make_job('final-staging-1', succeeded=1), make_job('cog-1')])
+
+    # get the job info
+    job_info = job_find.find_all_job_info('ns', 'cluster', ['staging-1', 'hazus-1', 'final-staging-1', 'cog-1'])
+
+    # make sure the states were classified
+    assert job_info == {'staging-1': ('Running', ''), 'hazus-1': ('Failed', 'Failed'), 'final-staging-1': ('Complete', 'Succeeded'),
+                        'cog-1': ('Pending', '')}
+
+    # make sure the list was filtered to the supervisor jobs and no job was looked up by name
+    job_find.api_instance.list_namespaced_job.assert_called_once_with(namespace='ns', label_selector='apsviz-supervisor=true')
+    job_find.api_instance.read_namespaced_job.assert_not_called()
+
+
+def test_find_all_job_info_unlabelled():
+    """
+    tests that expected jobs missing from the labelled list are looked up by name, and that jobs that do not exist are left out.
+
+    :return:
+    """
+    # get the object with the mocked API
+    job_find = get_job_find()
+
+    # the labelled list only has one of the jobs
+    job_find.api_instance.list_namespaced_job.return_value = client.V1JobList(items=[make_job('staging-1', active=1)])
+
+    # the unlabelled job is found by name, the other one no longer exists
+    job_find.api_instance.read_namespaced_job.side_effect = read_job
+
+    # get the job info
+    job_info = job_find.find_all_job_info('ns', 'cluster', ['staging-1', 'hazus-1', 'gone-1'])
+
+    # make sure the unlabelled job was added and the missing job was not
+    assert job_info == {'staging-1': ('Running', ''), 'hazus-1': ('Complete', 'Succeeded')}
+
+    # make sure only the jobs missing from the list were looked up
+    assert {call.kwargs['name'] for call in job_find.api_instance.read_namespaced_job.call_args_list} == {'hazus-1', 'gone-1'}
+
+
+def test_find_all_job_info_error():
+    """
+    tests that a failed job list returns None so the runs are checked again on the next pass.
+
+    :return:
+    """
+    # get the object with the mocked API
+    job_find = get_job_find()
+
+    # fail the job list
+    job_find.api_instance.list_namespaced_job.side_effect = client.ApiException(status=500)
+
+    # make sure the error was reported as None
+    assert job_find.find_all_job_info('ns', 'cluster', ['staging-1']) is None
@@ -0,0 +1,50 @@
+# SPDX-FileCopyrightText: 2022 Renaissance Computing Institute. All rights reserved.
+# SPDX-FileCopyrightText: 2023 Renaissance Computing Institute. All rights reserved.
+# SPDX-FileCopyrightText: 2024 Renaissance Computing Institute. All rights reserved.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-License-Identifier: LicenseRef-RENCI
+# SPDX-License-Identifier: MIT
+
+"""
+    Job supervisor run loop tests.
+
+    Author: Phil Owen, RENCI.org
+"""
+from unittest.mock import patch
+from src.supervisor.job_supervisor import JobSupervisor
+from src.common.utils import Utils
+
+
+def test_sleep_timeout_backoff():
+    """
+    tests that the poll sleep backs off on idle passes, stops at the long sleep and resets on activity.
+
+    :return:
+    """
+    # the base config with the poll rates
+    base_config: dict = {'JOB_LIMIT_MULTIPLIER': '1', 'MAX_NO_ACTIVITY_COUNT': 3, 'POLL_SHORT_SLEEP': 10, 'POLL_LONG_SLEEP': 60}
+
+    # create the supervisor without a DB connection or a deployed base config
+    with patch('src.supervisor.job_supervisor.PGImplementation'), patch.object(Utils, 'get_base_config', return_value=base_config):
+        sv = JobSupervisor()
+
+    # init the sleep times of each pass
+    sleep_timeouts: list = []
+
+    # run idle passes the way the run loop counts them
+    for _ in range(7):
+        sv.loop_state['no_activity_count'] += 1
+        sleep_timeouts.append(sv.get_sleep_timeout())
+
+    # make sure the sleep stays short until the limit, doubles and then stays at the long sleep
+    assert sleep_timeouts == [10, 10, 20, 40, 60, 60, 60]
+
+    # make sure the idle count no longer grows once the long sleep is reached
+    assert sv.loop_state['no_activity_count'] == 4
+
+    # a pass with activity clears the count
+    sv.loop_state['no_activity_count'] = 0
+
+    # make sure the sleep is back to the short sleep
+    assert sv.get_sleep_timeout() == 10
@@ -0,0 +1,67 @@
+# SPDX-FileCopyrightText: 2022 Renaissance Computing Institute. All rights reserved.
+# SPDX-FileCopyrightText: 2023 Renaissance Computing Institute. All rights reserved.
+# SPDX-FileCopyrightText: 2024 Renaissance Computing Institute. All rights reserved.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-License-Identifier: LicenseRef-RENCI
+# SPDX-License-Identifier: MIT
+
+"""
+    DB implementation tests.
+
+    Author: Phil Owen, RENCI.org
+"""
+from unittest.mock import patch
+from src.common.pg_impl import PGImplementation
+
+
+def test_update_job_status_bulk():
+    """
+    tests that the run status updates are written as one VALUES list.
+    no DB names are passed in so no DB connection is made, and the SQL call is swapped out.
+
+    :return:
+    """
+    # create the DB object without a DB connection
+    pg_db = PGImplementation(())
+
+    # capture the SQL call
+    with patch.object(pg_db, 'exec_sql_values') as exec_sql_values:
+        # write the status of two runs, one with a HECRAS suffix
+        pg_db.update_job_status_bulk({'4372-2023061218-namforecast': 'staging running', '4373-2023061218-ofcl_HECRAS': 'x' * 2000})
+
+    # make sure the updates were written in one call
+    exec_sql_values.assert_called_once()
+
+    # get the DB name and the VALUES rows
+    db_name, _, rows = exec_sql_values.call_args.args
+
+    # make sure the instance id, uid and status were split out, and the status was cut down to the column size
+    assert db_name == 'apsviz'
+    assert rows == [(4372, '2023061218-namforecast', 'staging running'), (4373, '2023061218-ofcl_HECRAS', 'x' * 1024)]
+
+
+def test_update_job_status_bulk_invalid_run_ids():
+    """
+    tests that malformed run ids are skipped and the rest of the updates are still written.
+
+    :return:
+    """
+    # create the DB object without a DB connection
+    pg_db = PGImplementation(())
+
+    # capture the SQL call
+    with patch.object(pg_db, 'exec_sql_values') as exec_sql_values:
+        # write the status of a good run and runs with a non-numeric instance id, no uid and no id at all
+        pg_db.update_job_status_bulk({'abc-2023061218-namforecast': 'bad', '4372': 'bad', '': 'bad', '4372-2023061218-namforecast': 'good'})
+
+    # make sure only the good run was written
+    assert exec_sql_values.call_args.args[2] == [(4372, '2023061218-namforecast', 'good')]
+
+    # capture the SQL call
+    with patch.object(pg_db, 'exec_sql_values') as exec_sql_values:
+        # write only malformed run ids
+        pg_db.update_job_status_bulk({'abc-def': 'bad', '4372': 'bad'})
+
+    # make sure the DB was not called
+    exec_sql_values.assert_not_called()
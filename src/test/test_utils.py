@@ -0,0 +1,88 @@
+# SPDX-FileCopyrightText: 2022 Renaissance Computing Institute. All rights reserved.
+# SPDX-FileCopyrightText: 2023 Renaissance Computing Institute. All rights reserved.
+# SPDX-FileCopyrightText: 2024 Renaissance Computing Institute. All rights reserved.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-License-Identifier: LicenseRef-RENCI
+# SPDX-License-Identifier: MIT
+
+"""
+    Common utility tests.
+
+    Author: Phil Owen, RENCI.org
+"""
+import asyncio
+import logging
+from unittest.mock import patch
+from src.common.utils import Utils
+
+
+def test_queued_slack_msgs():
+    """
+    tests that queued Slack msgs are posted as one msg per channel and that a flush empties the queue.
+    the base config and the Slack post are swapped out so no config file or Slack access is needed.
+
+    :return:
+    """
+    # create the utils object for a system that posts to Slack
+    with patch.object(Utils, 'get_base_config', return_value={}):
+        utils = Utils(logging.getLogger(__name__), 'Prod', 'test')
+
+    async def queue_and_flush():
+        """
+        queues msgs for two channels then flushes them
+
+        :return: nothing
+        """
+        # queue the msgs without giving the worker a chance to run, so they are all in one batch
+        utils.queue_slack_msg('run-1', 'first', 'slack_status_channel')
+        utils.queue_slack_msg('run-1', 'second', 'slack_issues_channel')
+        utils.queue_slack_msg('run-1', 'third', 'slack_status_channel')
+
+        # send everything that was queued
+        await utils.flush_slack_msgs(timeout=5)
+
+    # capture the Slack posts
+    with patch.object(utils, 'post_slack_msg') as post_slack_msg:
+        asyncio.run(queue_and_flush())
+
+    # get the text posted to each channel
+    posts: dict = {call.args[0]: call.args[1] for call in post_slack_msg.call_args_list}
+
+    # make sure there was one post per channel with the msgs joined in the order they were queued
+    assert post_slack_msg.call_count == 2
+    assert posts['slack_status_channel'] == '\n'.join([utils.format_slack_msg('run-1', 'first'), utils.format_slack_msg('run-1', 'third')])
+    assert posts['slack_issues_channel'] == utils.format_slack_msg('run-1', 'second')
+
+    # make sure nothing is left in the queue
+    assert utils.slack_queue.empty()
+
+
+def test_queued_slack_msgs_not_posted():
+    """
+    tests that debug mode msgs are not queued to be posted.
+
+    :return:
+    """
+    # create the utils object for a system that posts to Slack
+    with patch.object(Utils, 'get_base_config', return_value={}):
+        utils = Utils(logging.getLogger(__name__), 'Prod', 'test')
+
+    async def queue_and_flush():
+        """
+        queues a debug mode msg then flushes
+
+        :return: nothing
+        """
+        # queue a msg in debug mode
+        utils.queue_slack_msg('run-1', 'debug', 'slack_status_channel', debug_mode=True)
+
+        # send everything that was queued
+        await utils.flush_slack_msgs(timeout=5)
+
+    # capture the Slack posts
+    with patch.object(utils, 'post_slack_msg') as post_slack_msg:
+        asyncio.run(queue_and_flush())
+
+    # make sure nothing was posted
+    post_slack_msg.assert_not_called()